@@ -1,10 +1,12 @@
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from typing import Dict, Any, Optional, List
 import os
+import json
+import time
 from pathlib import Path
 
 from src.DocIngestion.data_ingestion import (
@@ -15,8 +17,13 @@ from src.DocIngestion.data_ingestion import (
 )
 from src.DocAnalyzer.data_analysis import DocumentAnalyzer
 from src.DocComparison.document_comparer import DocumentComparer
-from src.DocChat.retrieval import ConversationRAG
-from utils.file_io import save_uploaded_files
+from src.DocChat.session_pool import get_session_pool, get_history_store
+from src.DocIngestion.ingestion_jobs import get_ingestion_jobs, FAILED
+from utils.file_io import save_uploaded_files, UploadLimitExceeded
+from utils.document_ops import FastAPIFileAdapter, join_pages
+from utils.concurrency import run_io, run_cpu, shutdown_executors
+from utils.metrics import METRICS, HTTP_SECONDS
+from utils.session_janitor import get_session_janitor, janitor_enabled
 
 UPLOAD_BASE = os.getenv("UPLOAD_BASE", "data")
 FAISS_BASE = os.getenv("FAISS_BASE", "faiss_index")
@@ -34,6 +41,36 @@ app.add_middleware(
 app.mount("/static", StaticFiles(directory = Path(__file__).parent.parent / "static"), name="static")
 templates = Jinja2Templates(directory= Path(__file__).parent.parent / "templates")
 
+@app.middleware("http")
+async def _record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        #Label by route template (e.g. /chat/index/jobs/{job_id}) to keep label cardinality bounded
+        route = request.scope.get("route")
+        METRICS.observe(HTTP_SECONDS, time.perf_counter() - start, "HTTP request latency",
+                        method=request.method, path=getattr(route, "path", "unmatched"), status=status)
+
+@app.on_event("startup")
+def _start_session_janitor() -> None:
+    janitor = get_session_janitor()
+    #Sessions with pending ingestion or a warm chat pipeline are in use
+    janitor.add_in_use_source(get_ingestion_jobs().active_sessions)
+    janitor.add_in_use_source(get_session_pool().session_ids)
+    janitor.add_evict_listener(get_history_store().clear)
+    if janitor_enabled():
+        janitor.start()
+
+@app.on_event("shutdown")
+def _shutdown_executors() -> None:
+    get_session_janitor().stop()
+    get_ingestion_jobs().shutdown()
+    shutdown_executors()
+
 @app.get("/", response_class=HTMLResponse)
 async def serve_ui(request: Request):
     #will render templates/index.html
@@ -46,41 +83,55 @@ def health() -> Dict[str, str]:
     """
     return {"status": "ok", "service": "Document Portal"}
 
-class FastAPIFileAdapter:
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
     """
-    Adapter to convert FastAPI UploadFile to a standard file-like object.
+    Per-stage latency, cache hit/miss, LLM call/token and HTTP latency metrics (Prometheus text format).
     """
-    def __init__(self, upload_file: UploadFile):
-        self._upload_file = upload_file
-        self.name = upload_file.filename
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
 
-    def getbuffer(self) -> bytes:
-        self._upload_file.file.seek(0)
-        return self._upload_file.file.read()
-    
-def _read_pdf_via_handler(handler: DocHandler, path: str) -> str:
+def _upload_limit_error(e: BaseException) -> Optional[UploadLimitExceeded]:
     """
-    Helper function to read PDF content via DocHandler.
+    Find an UploadLimitExceeded anywhere in the exception chain.
     """
-    if hasattr(handler, "read_pdf"):
-        return handler.read_pdf(path)
-    if hasattr(handler, "read_"):
-        return handler.read_(path)
-    raise RuntimeError("DocHandler has neither read_pdf nor read_ method.")
+    seen = set()
+    while e is not None and id(e) not in seen:
+        if isinstance(e, UploadLimitExceeded):
+            return e
+        seen.add(id(e))
+        e = e.__cause__ or e.__context__
+    return None
+
 
 @app.post("/analyze")
-async def analyze_document(file: UploadFile = File(...)) -> Any:
+async def analyze_document(file: UploadFile = File(...),
+                           mode: str = Form("auto")) -> Any:
+    """
+    mode: "single" (one LLM call), "map_reduce" (windowed summaries + reduce)
+    or "auto" (map_reduce when the text exceeds analysis.single_call_max_chars).
+    """
     try:
+        if mode not in ("auto", "single", "map_reduce"):
+            raise HTTPException(status_code=400, detail=f"Unsupported analysis mode: {mode}")
         dh = DocHandler()
-        saved_path = dh.save_pdf(FastAPIFileAdapter(file))
-        text = _read_pdf_via_handler(dh, saved_path)
+        with get_session_janitor().lease(dh.session_id):
+            saved_path = await run_io(dh.save_pdf, FastAPIFileAdapter(file))
+            pages = await run_cpu(dh.read_pages, saved_path)
 
-        analyzer = DocumentAnalyzer()
-        result = analyzer.analyze_metadata(text)
+            analyzer = DocumentAnalyzer()
+            if mode == "map_reduce" or (mode == "auto" and analyzer.needs_map_reduce(pages)):
+                pdf_metadata = await run_io(dh.read_pdf_metadata, saved_path)
+                result = await analyzer.aanalyze_document(pages, pdf_metadata)
+            else:
+                #Same text DocHandler.read_pdf builds, from the pages already read
+                result = await analyzer.aanalyze_metadata(join_pages(pages))
         return JSONResponse(content=result)
     except HTTPException:
         raise 
     except Exception as e:
+        limit_error = _upload_limit_error(e)
+        if limit_error is not None:
+            raise HTTPException(status_code=413, detail=str(limit_error))
         raise HTTPException(status_code=500, detail=f"Analysis Failed: {e}")
                         
 @app.post("/compare")
@@ -88,15 +139,20 @@ async def compare_documents(reference: UploadFile = File(...),
                             actual: UploadFile = File(...)) -> Any:
     try:
         dc = DocumentComparator()
-        ref_path, act_path = dc.save_uploaded_files(FastAPIFileAdapter(reference), FastAPIFileAdapter(actual))
-        _ = ref_path, act_path
-        combined_text = dc.combine_documents()
-        comp = DocumentComparer()
-        df = comp.compare_documents(combined_text)
+        with get_session_janitor().lease(dc.session_id):
+            ref_path, act_path = await run_io(dc.save_uploaded_files, FastAPIFileAdapter(reference), FastAPIFileAdapter(actual))
+            ref_pages = await run_cpu(dc.read_pages, ref_path)
+            act_pages = await run_cpu(dc.read_pages, act_path)
+            comp = DocumentComparer()
+            #Identical pages are resolved locally; only changed pages' diffs reach the LLM
+            df = await comp.acompare_pages(ref_pages, act_pages)
         return {"rows": df.to_dict(orient="records"), "session_id": dc.session_id}
     except HTTPException:
         raise 
     except Exception as e:
+        limit_error = _upload_limit_error(e)
+        if limit_error is not None:
+            raise HTTPException(status_code=413, detail=str(limit_error))
         raise HTTPException(status_code=500, detail=f"Comparison Failed: {e}")
     
 @app.post("/chat/index")
@@ -107,7 +163,12 @@ async def chat_build_index(
     chunk_size: int = Form(1000),
     chunk_overlap: int = Form(200),
     k: int = Form(5),
+    wait: bool = Form(False),
 ) -> Any:
+    """
+    Save the uploads, then queue parsing, splitting, embedding and indexing as a background job.
+    Returns the job_id immediately (poll /chat/index/jobs/{job_id}); wait=true blocks until it finishes.
+    """
     try:
         wrapped = [FastAPIFileAdapter(file) for file in files]
         ci = ChatIngestor(
@@ -116,13 +177,39 @@ async def chat_build_index(
             use_session_dirs = use_session_dirs,
             session_id = session_id or None,
         )
-        ci.build_retriever(wrapped, chunk_size=chunk_size, chunk_overlap=chunk_overlap, k=k)
-        return {"session_id": ci.session_id, "k": k, "use_session_dirs": use_session_dirs}
+        jobs = get_ingestion_jobs()
+        #Leased until the job is queued; from then on the job itself keeps the session in use
+        with get_session_janitor().lease(ci.session_id):
+            #Uploads must be read while the request is open; everything after runs in the job
+            paths = await run_io(ci.save_files, wrapped)
+            #One lane per index directory: ingestions into the same index are serialized
+            job = jobs.submit(
+                str(ci.faiss_dir.resolve()), ci.session_id,
+                lambda progress: ci.index_files(paths, chunk_size=chunk_size, chunk_overlap=chunk_overlap, progress=progress),
+            )
+        state = await run_io(jobs.wait, job.job_id) if wait else jobs.get(job.job_id)
+        if state["status"] == FAILED:
+            raise HTTPException(status_code=500, detail=f"Indexing Failed: {state['error']}")
+        return {"session_id": ci.session_id, "k": k, "use_session_dirs": use_session_dirs,
+                "job_id": job.job_id, "status": state["status"]}
     except HTTPException:
         raise 
     except Exception as e:
+        limit_error = _upload_limit_error(e)
+        if limit_error is not None:
+            raise HTTPException(status_code=413, detail=str(limit_error))
         raise HTTPException(status_code=500, detail=f"Indexing Failed: {e}")
     
+@app.get("/chat/index/jobs/{job_id}")
+def chat_index_job(job_id: str) -> Any:
+    """
+    Status and per-stage progress of an ingestion job (files parsed, chunks embedded, index saved).
+    """
+    state = get_ingestion_jobs().get(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return state
+
 @app.post("/chat/query")
 async def chat_query(
     question: str = Form(...),
@@ -139,17 +226,18 @@ async def chat_query(
         if not os.path.isdir(index_dir):
             raise HTTPException(status_code=404, detail=f"Index path {index_dir} does not exist.")
         
-        #Initialize LCEL-style RAG pipeline
-        rag = ConversationRAG(
-            session_id = session_id
-        )
-        rag.load_retriever_from_faiss(index_dir)
+        with get_session_janitor().lease(session_id):
+            #Reuse the session's ready LCEL-style RAG pipeline and its recent chat history
+            rag = await run_io(get_session_pool().get, session_id, index_dir, k)
+            history = get_history_store()
+            chat_history = await run_io(history.load, session_id) if session_id else []
 
-        #Optional: for now we pass empty chat history
-        response = rag.invoke(
-            user_input=question,
-            chat_history=[]
-        )
+            response = await rag.ainvoke(
+                user_input=question,
+                chat_history=chat_history
+            )
+            if session_id:
+                await run_io(history.append, session_id, question, response)
         return {
             "answer": response,
             "session_id": rag.session_id,
@@ -161,4 +249,50 @@ async def chat_query(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query Failed: {e}")
     
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/chat/query/stream")
+async def chat_query_stream(
+    question: str = Form(...),
+    session_id: Optional[str] = Form(None),
+    use_session_dirs: bool = Form(True),
+    k: int = Form(5),
+) -> Any:
+    """
+    Server-sent-events variant of /chat/query: a "metadata" event with the retrieved sources,
+    then one "token" event per generated chunk, then "done" (or "error").
+    """
+    try:
+        if use_session_dirs and not session_id:
+            raise HTTPException(status_code=400, detail="Session ID is required when using session directories.")
+
+        index_dir = os.path.join(FAISS_BASE, session_id) if use_session_dirs else FAISS_BASE
+        if not os.path.isdir(index_dir):
+            raise HTTPException(status_code=404, detail=f"Index path {index_dir} does not exist.")
+
+        rag = await run_io(get_session_pool().get, session_id, index_dir, k)
+        history = get_history_store()
+        chat_history = await run_io(history.load, session_id) if session_id else []
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Query Failed: {e}")
+
+    async def event_stream():
+        try:
+            with get_session_janitor().lease(session_id):
+                async for event in rag.astream(user_input=question, chat_history=chat_history):
+                    if event["type"] == "done" and session_id:
+                        await run_io(history.append, session_id, question, event["answer"])
+                    yield _sse(event["type"], event)
+        except Exception as e:
+            yield _sse("error", {"type": "error", "detail": f"Query Failed: {e}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 #uvicorn main:app --reload (from within api)
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Recall-vs-latency report for the FAISS index types selectable under faiss_db.index in config.yaml.
+
+Runs fully offline on a synthetic clustered corpus:
+    python -m benchmarks.faiss_index_report --vectors 20000 --dim 128 --output benchmarks/results/faiss_index_report.md
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import faiss
+import numpy as np
+
+from utils.faiss_index import build_index, apply_search_params
+
+CONFIGS: List[Dict[str, Any]] = [
+    {"type": "flat"},
+    {"type": "hnsw", "hnsw": {"m": 16, "ef_construction": 200, "ef_search": 16}},
+    {"type": "hnsw", "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 64}},
+    {"type": "hnsw", "hnsw": {"m": 32, "ef_construction": 200, "ef_search": 128}},
+    {"type": "ivf", "ivf": {"nlist": 128, "nprobe": 1}},
+    {"type": "ivf", "ivf": {"nlist": 128, "nprobe": 8}},
+    {"type": "ivf", "ivf": {"nlist": 128, "nprobe": 32}},
+    {"type": "pq", "pq": {"m": 16, "nbits": 8}},
+    {"type": "ivfpq", "ivf": {"nlist": 128, "nprobe": 8}, "pq": {"m": 16, "nbits": 8}},
+    {"type": "ivfpq", "ivf": {"nlist": 128, "nprobe": 32}, "pq": {"m": 32, "nbits": 8}},
+]
+
+def synthetic_corpus(n: int, dim: int, n_queries: int, seed: int = 42):
+    """Clustered gaussian vectors, roughly shaped like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, n // 200), dim)).astype(np.float32)
+    labels = rng.integers(0, len(centers), size=n + n_queries)
+    data = centers[labels] + 0.35 * rng.normal(size=(n + n_queries, dim)).astype(np.float32)
+    return np.ascontiguousarray(data[:n]), np.ascontiguousarray(data[n:])
+
+def describe(cfg: Dict[str, Any]) -> str:
+    params = {k: v for k, v in cfg.items() if k != "type"}
+    flat = ", ".join(f"{k2}={v2}" for sub in params.values() for k2, v2 in sub.items())
+    return f"{cfg['type']}({flat})" if flat else cfg["type"]
+
+def run(n: int, dim: int, n_queries: int, k: int) -> List[Dict[str, Any]]:
+    corpus, queries = synthetic_corpus(n, dim, n_queries)
+    exact = faiss.IndexFlatL2(dim)
+    exact.add(corpus)
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for cfg in CONFIGS:
+        start = time.perf_counter()
+        index = build_index(dim, cfg, corpus)
+        index.add(corpus)
+        apply_search_params(index, cfg)
+        build_s = time.perf_counter() - start
+
+        latencies = []
+        hits = 0
+        for qi in range(n_queries):
+            t0 = time.perf_counter()
+            _, ids = index.search(queries[qi:qi + 1], k)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            hits += len(set(ids[0].tolist()) & set(truth[qi].tolist()))
+
+        rows.append({
+            "index": describe(cfg),
+            "recall_at_k": round(hits / (n_queries * k), 4),
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 4),
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 4),
+            "build_seconds": round(build_s, 3),
+            "index_mb": round(faiss.serialize_index(index).nbytes / (1024 * 1024), 2),
+        })
+    return rows
+
+def to_markdown(rows: List[Dict[str, Any]], n: int, dim: int, n_queries: int, k: int) -> str:
+    lines = [
+        "# FAISS index recall vs latency",
+        "",
+        f"Synthetic clustered corpus: {n} vectors, dim {dim}, {n_queries} single-vector queries, recall@{k} "
+        "against exact flat search. Generated by `python -m benchmarks.faiss_index_report`.",
+        "",
+        "| index | recall@k | p50 ms | p95 ms | build s | size MB |",
+        "|---|---|---|---|---|---|",
+    ]
+    for r in rows:
+        lines.append(f"| {r['index']} | {r['recall_at_k']} | {r['latency_ms_p50']} | {r['latency_ms_p95']} "
+                     f"| {r['build_seconds']} | {r['index_mb']} |")
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--output", type=str, default=None, help="Write the markdown report here (and .json alongside)")
+    args = parser.parse_args()
+
+    rows = run(args.vectors, args.dim, args.queries, args.k)
+    report = to_markdown(rows, args.vectors, args.dim, args.queries, args.k)
+    print(report)
+    if args.output:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(report, encoding="utf-8")
+        out.with_suffix(".json").write_text(json.dumps(rows, indent=2), encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
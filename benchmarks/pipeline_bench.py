@@ -0,0 +1,312 @@
+"""
+Offline throughput and latency benchmark for the ingestion, retrieval and LLM-chain paths.
+
+Uses deterministic fake embeddings, a fake chat model (optionally with simulated latency) and a
+generated PDF/DOCX/TXT corpus, so it needs no API keys or network:
+    python -m benchmarks.pipeline_bench --docs 9 --pages 12 --queries 50 --output benchmarks/results/pipeline_bench.json
+Compare against an earlier run with --baseline <previous.json>.
+"""
+import os
+import json
+import time
+import random
+import shutil
+import zipfile
+import tempfile
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+WORDS = ("agreement supplier customer warranty liability invoice delivery payment term notice party "
+         "service level availability penalty schedule amendment termination renewal confidential data "
+         "security audit report quarter revenue forecast risk compliance policy procedure approval").split()
+
+ANALYSIS_RESPONSE = json.dumps({
+    "Summary": ["Synthetic benchmark document."], "Title": "Benchmark", "Author": ["bench"],
+    "DateCreated": "unknown", "LastModifiedDate": "unknown", "Publisher": "bench",
+    "Language": "English", "PageCount": 1, "SentimentTone": "neutral",
+})
+COMPARISON_RESPONSE = json.dumps([{"Page": "1", "changes": "Synthetic change"}])
+
+class OfflineChatModel(SimpleChatModel):
+    """Chat model returning a fixed response after latency_ms, standing in for the provider."""
+    response: str = "Synthetic answer."
+    latency_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline-benchmark"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        return self.response
+
+@contextmanager
+def offline_models(embeddings, llm):
+    """Route every ModelLoader in the process to the offline embeddings and chat model."""
+    from utils.model_loader import ModelLoader
+    originals = (ModelLoader._validate_env, ModelLoader.load_embeddings, ModelLoader.load_llm)
+    ModelLoader._validate_env = lambda self: setattr(self, "api_keys", {})
+    ModelLoader.load_embeddings = lambda self: embeddings
+    ModelLoader.load_llm = lambda self, provider_key=None: llm
+    try:
+        yield
+    finally:
+        ModelLoader._validate_env, ModelLoader.load_embeddings, ModelLoader.load_llm = originals
+
+class StageTimer:
+    """Collects wall-clock samples and item counts per stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.items: Dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def measure(self, stage: str, items: int = 1):
+        start = time.perf_counter()
+        yield
+        self.samples[stage].append(time.perf_counter() - start)
+        self.items[stage] += items
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for stage, samples in self.samples.items():
+            ms = np.array(samples) * 1000
+            total = float(sum(samples))
+            result[stage] = {
+                "runs": len(samples),
+                "items": self.items[stage],
+                "total_seconds": round(total, 4),
+                "items_per_second": round(self.items[stage] / total, 2) if total else None,
+                "latency_ms_p50": round(float(np.percentile(ms, 50)), 3),
+                "latency_ms_p95": round(float(np.percentile(ms, 95)), 3),
+                "latency_ms_p99": round(float(np.percentile(ms, 99)), 3),
+            }
+        return result
+
+# ---------- Corpus ----------
+def _paragraph(rng: random.Random, words: int) -> str:
+    out = []
+    for i in range(words):
+        out.append(rng.choice(WORDS))
+        if i % 40 == 39:
+            out.append(f"clause {rng.randint(1, 20)}.{rng.randint(1, 9)} part A-{rng.randint(1000, 9999)}.")
+    return " ".join(out)
+
+def _page_texts(rng: random.Random, pages: int, words_per_page: int) -> List[str]:
+    return [_paragraph(rng, words_per_page) for _ in range(pages)]
+
+def write_pdf(path: Path, pages: List[str]) -> None:
+    with fitz.open() as doc:
+        for text in pages:
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(40, 40, 555, 800), text, fontsize=8)
+        doc.save(str(path))
+
+def write_docx(path: Path, pages: List[str]) -> None:
+    """Minimal WordprocessingML package: one paragraph per page."""
+    body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in pages)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        z.writestr("_rels/.rels",
+                   '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+        z.writestr("word/document.xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                   f"<w:body>{body}</w:body></w:document>")
+
+def generate_corpus(out_dir: Path, docs: int, pages: int, words_per_page: int, seed: int = 42) -> Dict[str, List[Path]]:
+    """Round-robin PDF/DOCX/TXT files; returns paths by extension."""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    corpus: Dict[str, List[Path]] = {".pdf": [], ".docx": [], ".txt": []}
+    for i in range(docs):
+        ext = (".pdf", ".docx", ".txt")[i % 3]
+        texts = _page_texts(rng, pages, words_per_page)
+        path = out_dir / f"doc_{i:03d}{ext}"
+        if ext == ".pdf":
+            write_pdf(path, texts)
+        elif ext == ".docx":
+            write_docx(path, texts)
+        else:
+            path.write_text("\n\n".join(texts), encoding="utf-8")
+        corpus[ext].append(path)
+    return corpus
+
+def _revise(pages: List[str], rng: random.Random) -> List[str]:
+    """Copy of a document with a few pages edited, one removed and one added."""
+    revised = list(pages)
+    for i in rng.sample(range(len(revised)), max(1, len(revised) // 5)):
+        revised[i] = revised[i].replace("warranty", "guarantee", 3) + " Amended."
+    if len(revised) > 2:
+        del revised[len(revised) // 2]
+    revised.append(_paragraph(rng, 200))
+    return revised
+
+# ---------- Benchmark ----------
+def run(args) -> Dict[str, Any]:
+    work = Path(tempfile.mkdtemp(prefix="docportal_bench_"))
+    try:
+        return _run(args, work)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+def _run(args, work: Path) -> Dict[str, Any]:
+    #Keep every on-disk cache inside the scratch dir so each run starts cold
+    os.environ["EMBEDDING_CACHE_PATH"] = str(work / "embeddings.sqlite")
+    os.environ["PDF_TEXT_CACHE_DIR"] = str(work / "pdf_text")
+    os.environ["CHAT_HISTORY_PATH"] = str(work / "chat_history.sqlite")
+
+    from src.DocIngestion.data_ingestion import ChatIngestor, FaissManager
+    from src.DocChat.retrieval import ConversationRAG
+    from src.DocAnalyzer.data_analysis import DocumentAnalyzer
+    from src.DocComparison.document_comparer import DocumentComparer
+    from utils.document_ops import load_documents
+    from utils.file_io import save_uploaded_files
+    from utils.lexical_index import make_retriever
+    from utils.pdf_extractor import get_pdf_extractor
+
+    rng = random.Random(args.seed)
+    timer = StageTimer()
+    embeddings = DeterministicFakeEmbedding(size=args.dim)
+    llm = OfflineChatModel(latency_ms=args.llm_latency_ms)
+    corpus = generate_corpus(work / "corpus", args.docs, args.pages, args.words_per_page, args.seed)
+    files = [p for paths in corpus.values() for p in paths]
+
+    with offline_models(embeddings, llm):
+        ci = ChatIngestor(temp_base=str(work / "data"), faiss_base=str(work / "faiss"), session_id="bench")
+
+        handles = [open(p, "rb") for p in files]
+        try:
+            with timer.measure("save_uploaded_files", items=len(files)):
+                saved = save_uploaded_files(handles, ci.temp_dir)
+        finally:
+            for h in handles:
+                h.close()
+
+        with timer.measure("load_documents", items=len(saved)):
+            docs = load_documents(saved)
+        with timer.measure("split", items=len(docs)):
+            chunks = ci._split(docs, args.chunk_size, args.chunk_overlap)
+
+        fm = FaissManager(ci.faiss_dir, ci.model_loader)
+        with timer.measure("embed_and_index", items=len(chunks)):
+            fm.add_document(chunks)
+        with timer.measure("reingest_dedup", items=len(chunks)):
+            FaissManager(ci.faiss_dir, ci.model_loader).add_document(chunks)
+
+        queries = [_paragraph(rng, rng.randint(4, 12)) for _ in range(args.queries)]
+        retriever = make_retriever(fm.vs, ci.faiss_dir, args.k)
+        for q in queries:
+            with timer.measure("retrieve"):
+                retriever.invoke(q)
+
+        llm.response = "Synthetic answer."
+        rag = ConversationRAG(session_id="bench", retriever=retriever)
+        for q in queries:
+            with timer.measure("rag_invoke"):
+                rag.invoke(q, [])
+
+        llm.response = ANALYSIS_RESPONSE
+        analyzer = DocumentAnalyzer()
+        extractor = get_pdf_extractor()
+        pdf_pages = {}
+        for path in corpus[".pdf"]:
+            with timer.measure("pdf_extract_pages", items=args.pages):
+                pdf_pages[path] = extractor.extract_pages(path)
+        for path, pages in pdf_pages.items():
+            with timer.measure("analyze_single", items=len(pages)):
+                analyzer.analyze_metadata("\n".join(pages))
+            with timer.measure("analyze_map_reduce", items=len(pages)):
+                analyzer.analyze_document(pages, extractor.read_metadata(path))
+
+        llm.response = COMPARISON_RESPONSE
+        comparer = DocumentComparer()
+        for pages in pdf_pages.values():
+            with timer.measure("compare_pages", items=len(pages)):
+                comparer.compare_pages(pages, _revise(pages, rng))
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "corpus": {"files": len(files), "pages_loaded": len(docs), "chunks": len(chunks)},
+        "stages": timer.summary(),
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+def to_markdown(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> str:
+    lines = [
+        "# Document Portal offline pipeline benchmark",
+        "",
+        f"Commit {result['meta']['git_commit']}, corpus {result['corpus']}, params {result['params']}.",
+        "",
+        "| stage | runs | items | items/s | p50 ms | p95 ms | p99 ms |" + (" p50 vs baseline |" if baseline else ""),
+        "|---|---|---|---|---|---|---|" + ("---|" if baseline else ""),
+    ]
+    for stage, s in result["stages"].items():
+        row = (f"| {stage} | {s['runs']} | {s['items']} | {s['items_per_second']} | {s['latency_ms_p50']} "
+               f"| {s['latency_ms_p95']} | {s['latency_ms_p99']} |")
+        if baseline:
+            base = (baseline.get("stages") or {}).get(stage)
+            if base and base["latency_ms_p50"]:
+                row += f" {100 * (s['latency_ms_p50'] / base['latency_ms_p50'] - 1):+.1f}% |"
+            else:
+                row += " n/a |"
+        lines.append(row)
+    return "\n".join(lines) + "\n"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=9, help="Generated files, round-robin PDF/DOCX/TXT")
+    parser.add_argument("--pages", type=int, default=12, help="Pages (paragraph blocks) per file")
+    parser.add_argument("--words-per-page", type=int, default=350)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=768, help="Fake embedding dimension")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Simulated latency per LLM call")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default=None, help="Write JSON results here (and .md alongside)")
+    parser.add_argument("--baseline", type=str, default=None, help="Earlier JSON result to compare p50 latencies against")
+    args = parser.parse_args()
+
+    result = run(args)
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    report = to_markdown(result, baseline)
+    print(report)
+    if args.output:
+        out = Path(args.output)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        out.with_suffix(".md").write_text(report, encoding="utf-8")
+
+if __name__ == "__main__":
+    main()
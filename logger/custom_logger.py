@@ -1,58 +1,206 @@
 import os
+import queue
+import atexit
+import random
 import logging
+import reprlib
+import threading
+import logging.handlers
 from datetime import datetime
+from typing import Any, Dict, Optional
+
 import structlog
 
+_DEFAULTS: Dict[str, Any] = {
+    "level": "INFO",
+    "queue_size": 10000,       # records buffered for the writer thread; excess records are dropped
+    "max_field_chars": 2000,   # longer field values are truncated before they are queued
+    "sample_rates": {},        # event name -> fraction of events kept (warnings and errors are always kept)
+}
+
+_state_lock = threading.Lock()
+_configured_pid: Optional[int] = None
+_log_file_path: Optional[str] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def _settings() -> Dict[str, Any]:
+    """
+    The logging section of config/config.yaml over the defaults; LOG_LEVEL overrides the level.
+    """
+    settings = dict(_DEFAULTS)
+    try:
+        from utils.config_loader import load_config
+        settings.update(load_config().get("logging") or {})
+    except Exception:
+        pass
+    settings["level"] = os.getenv("LOG_LEVEL", settings["level"])
+    return settings
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Hands records to the writer thread without formatting them on the caller's thread.
+    Never blocks: when the queue is full the record is dropped and counted. In a forked
+    child (where the writer thread does not exist) records are written to stderr directly.
+    """
+
+    def __init__(self, q: queue.Queue, fallback: logging.Handler):
+        super().__init__(q)
+        self.pid = os.getpid()
+        self.fallback = fallback
+        self.dropped = 0
+        self.reported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return
+        if self.dropped > self.reported:
+            #Report drops once the writer has caught up enough to accept records again
+            notice = logging.LogRecord("custom_logger", logging.WARNING, __file__, 0,
+                                       "%d log records dropped (queue full)", (self.dropped - self.reported,), None)
+            try:
+                self.queue.put_nowait(notice)
+                self.reported = self.dropped
+            except queue.Full:
+                pass
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if os.getpid() != self.pid:
+            self.fallback.handle(record)
+            return
+        super().emit(record)
+
+class _Sampler:
+    """structlog processor keeping only sample_rates[event] of info/debug events with that name."""
+
+    def __init__(self, rates: Dict[str, float]):
+        self.rates = {str(k): float(v) for k, v in (rates or {}).items()}
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        if self.rates and method_name in ("debug", "info"):
+            rate = self.rates.get(str(event_dict.get("event")))
+            if rate is not None and random.random() >= rate:
+                raise structlog.DropEvent
+        return event_dict
+
+class _FieldTruncator:
+    """
+    structlog processor bounding every field: long strings are cut to max_chars and other
+    objects are turned into a size-limited repr, so a queued record never holds large payloads.
+    """
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.repr = reprlib.Repr()
+        self.repr.maxstring = max_chars
+        self.repr.maxother = max_chars
+        self.repr.maxlist = self.repr.maxtuple = self.repr.maxset = self.repr.maxdict = 20
+        self.repr.maxlevel = 3
+
+    def _bound(self, value: Any) -> Any:
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        if not isinstance(value, str):
+            value = self.repr.repr(value)
+        if len(value) > self.max_chars:
+            return f"{value[:self.max_chars]}...(+{len(value) - self.max_chars} chars)"
+        return value
+
+    def __call__(self, logger, method_name: str, event_dict: Dict[str, Any]) -> Dict[str, Any]:
+        for key, value in event_dict.items():
+            if key != "exception":
+                event_dict[key] = self._bound(value)
+        return event_dict
+
+def _configure(log_dir: str) -> None:
+    """
+    Configure logging once per process: one timestamped JSON log file, a bounded queue in
+    front of the console and file handlers, and a background thread that renders and writes.
+    """
+    global _configured_pid, _log_file_path, _listener
+    settings = _settings()
+    os.makedirs(log_dir, exist_ok=True)
+    _log_file_path = os.path.join(log_dir, f"{datetime.now().strftime('%m_%d_%Y_%H_%M_%S')}_{os.getpid()}.log")
+
+    #Rendering to JSON happens on the writer thread, inside the handlers' formatter
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processors = [
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            structlog.processors.JSONRenderer(),
+        ],
+        foreign_pre_chain = [
+            structlog.processors.TimeStamper(fmt = "iso", utc = True, key = "timestamp"),
+            structlog.processors.add_log_level,
+        ],
+    )
+
+    #configure logging for console + file (both JSON)
+    file_handler = logging.FileHandler(_log_file_path)
+    file_handler.setFormatter(formatter)
+
+    #to log messages directly in the terminal while the application is running
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(maxsize = int(settings["queue_size"]))
+    queue_handler = _QueueHandler(log_queue, fallback = console_handler)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, _QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, str(settings["level"]).upper(), logging.INFO))
+
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+    _listener = logging.handlers.QueueListener(log_queue, console_handler, file_handler, respect_handler_level = True)
+    _listener.start()
+    atexit.register(_listener.stop) #flush queued records on shutdown
+
+    #configure structlog for JSON structured logging; only cheap processors run on the caller's thread
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            _Sampler(settings["sample_rates"]),
+            structlog.processors.TimeStamper(fmt = "iso", utc=True, key = "timestamp"),
+            structlog.processors.add_log_level,
+            structlog.processors.EventRenamer(to='event'),
+            #Tracebacks must be captured on the caller's thread
+            structlog.processors.format_exc_info,
+            _FieldTruncator(int(settings["max_field_chars"])),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        #Integrates structlog with Python's standard logging module, allowing you to use structlog's features while still using the standard logging interface.
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        #Ensures that the logger is cached after its first use for performance optimization.
+        cache_logger_on_first_use = True,
+    )
+    _configured_pid = os.getpid()
+
 class CustomLogger:
     def __init__(self, log_dir='logs'):
-        #Esnure logs directory exists
+        #Ensure logging is configured (once per process); every logger shares one log file
         self.log_dir = os.path.join(os.getcwd(), log_dir)
-        os.makedirs(self.log_dir, exist_ok=True)
-
-        #Timestamped log file (for persistence)
-        log_file = f"{datetime.now().strftime("%m_%d_%Y_%H_%M_%S")}.log"
-        self.log_file_path = os.path.join(self.log_dir, log_file)
+        if _configured_pid != os.getpid():
+            with _state_lock:
+                if _configured_pid != os.getpid():
+                    _configure(self.log_dir)
+        self.log_file_path = _log_file_path
 
     def get_logger(self, name = __file__):
         logger_name = os.path.basename(name)
-
-        #configure logging for console + file (both JSON)
-        file_handler = logging.FileHandler(self.log_file_path)
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(logging.Formatter("%(message)s")) #RAW JSON lines
-
-        #to log messages directly in the terminal while the application is running
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        console_handler.setFormatter(logging.Formatter("%(message)s"))
-
-        logging.basicConfig(
-            level=logging.INFO,
-            format="%(message)s", #strutclog will handle JSON formatting
-            handlers = [console_handler, file_handler]
-        )
-
-        #configure structlog for JSON structured logging
-        structlog.configure(
-            processors=[
-                structlog.processors.TimeStamper(fmt = "iso", utc=True, key = "timestamp"),
-                structlog.processors.add_log_level,
-                structlog.processors.EventRenamer(to='event'),
-                structlog.processors.JSONRenderer(),
-                
-            ],
-            #Integrates structlog with Python's standard logging module, allowing you to use structlog's features while still using the standard logging interface.
-            logger_factory=structlog.stdlib.LoggerFactory(),
-            #Ensures that the logger is cached after its first use for performance optimization.
-            cache_logger_on_first_use = True,
-        )
-
         return structlog.get_logger(logger_name)
-    
+
 if __name__ == "__main__":
     logger = CustomLogger().get_logger(__file__)
     logger.info("Custom logger initialized successfully.")
     logger.error("This is a test error message.")
     logger.debug("Debugging information here.")
     logger.warning("This is a warning message.")
-    logger.info({"event": "test_event", "message": "This is a structured log message."})
\ No newline at end of file
+    logger.info({"event": "test_event", "message": "This is a structured log message."})
@@ -24,6 +24,9 @@ class SummaryResponse(RootModel[list[ChangeFormat]]):
 
 class PromptType(str, Enum):
     DOCUMENT_COMPARISON = "document_comparison"
+    DOCUMENT_COMPARISON_DIFF = "document_comparison_diff"
     DOCUMENT_ANALYSIS = "document_analysis"
+    DOCUMENT_ANALYSIS_MAP = "document_analysis_map"
+    DOCUMENT_ANALYSIS_REDUCE = "document_analysis_reduce"
     CONTEXTUALIZE_QUESTION = "contextualize_question"
     CONTEXT_QA = "context_qa"
\ No newline at end of file
@@ -12,6 +12,34 @@ Analyze this document:
 """
 )
 
+document_analysis_map_prompt = ChatPromptTemplate.from_template(
+    """
+You are summarizing one section of a longer document ({section_label}).
+Write 2-4 concise bullet points capturing the key content of this section, then one line
+"Language: <language>" and one line "Tone: <overall tone>". Do not add anything else.
+
+Section text:
+{document_text}
+"""
+)
+
+document_analysis_reduce_prompt = ChatPromptTemplate.from_template(
+    """
+You are a highly capable assistant trained to analyze and summarize documents.
+The document was summarized section by section. Combine the section summaries below into
+the requested metadata. Use the known metadata as-is; infer the remaining fields from the summaries.
+Return ONLY valid JSON matching the exact schema below.
+
+{format_instructions}
+
+Known metadata:
+{known_metadata}
+
+Section summaries:
+{section_summaries}
+"""
+)
+
 document_comparison_prompt = ChatPromptTemplate.from_template(
     """
 You will be provided with content from two different documents. Your tasks are as follows:
@@ -30,6 +58,25 @@ Your response should follow this format:
 {format_instruction}
 """)
 
+document_comparison_diff_prompt = ChatPromptTemplate.from_template(
+    """
+You will be provided with page-level diffs between a reference document and an actual document.
+Pages that are identical have already been removed. Each section is a unified diff: lines starting
+with '-' appear only in the reference page, lines starting with '+' appear only in the actual page.
+
+1. For every section, describe the changes between the reference and actual page.
+2. Use the page label given in the section header as the page number.
+3. The output you provide must be page wise comparison content.
+
+Page diffs:
+
+{combined_docs}
+
+Your response should follow this format:
+
+{format_instruction}
+""")
+
 contextualization_prompt = ChatPromptTemplate.from_messages([
 ("system",(
     "Given a conversation history and the most recent user query, rewrite the query as a standalone question"
@@ -52,7 +99,10 @@ context_qa_prompt = ChatPromptTemplate.from_messages([
 
 PROMPT_REGISTRY = {
     "document_analysis": document_analysis_prompt,
+    "document_analysis_map": document_analysis_map_prompt,
+    "document_analysis_reduce": document_analysis_reduce_prompt,
     "document_comparison": document_comparison_prompt,
+    "document_comparison_diff": document_comparison_diff_prompt,
     "contextualize_question": contextualization_prompt,
     "context_qa": context_qa_prompt,
 }
\ No newline at end of file
@@ -1,12 +1,16 @@
 import os
+import re
 import sys
+import json
+from typing import Any, Dict, List, Optional
 from utils.model_loader import ModelLoader
+from utils.metrics import span
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 from model.models import *
 from prompts.prompt_library import PROMPT_REGISTRY
 
-from langchain_core.output_parsers import JsonOutputParser
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
 from langchain.output_parsers import OutputFixingParser
 
 
@@ -28,7 +32,15 @@ class DocumentAnalyzer:
                 llm = self.llm
             )
             self.prompt = PROMPT_REGISTRY['document_analysis']
-            
+
+            #Map-reduce mode for documents too large for a single call
+            analysis_cfg = self.loader.config.get("analysis") or {}
+            self.window_pages = int(analysis_cfg.get("window_pages", 8))
+            self.max_concurrency = int(analysis_cfg.get("max_concurrency", 4))
+            self.single_call_max_chars = int(analysis_cfg.get("single_call_max_chars", 60000))
+            self.map_chain = PROMPT_REGISTRY[PromptType.DOCUMENT_ANALYSIS_MAP.value] | self.llm | StrOutputParser()
+            self.reduce_chain = PROMPT_REGISTRY[PromptType.DOCUMENT_ANALYSIS_REDUCE.value] | self.llm | self.fixing_parser
+
             self.log.info("DocumentAnalyzer initialized successfully",)
 
         except Exception as e:
@@ -36,24 +48,123 @@ class DocumentAnalyzer:
             raise DocumentPortalException("Failed to initialize DocumentAnalyzer", sys) 
 
 
+    def _metadata_inputs(self, document_text: str) -> Dict[str, str]:
+        return {
+            'format_instructions': self.parser.get_format_instructions(),
+            'document_text': document_text
+        }
+
+    def _metadata_result(self, response: dict) -> dict:
+        self.log.info("Metadata extraction successful", keys=list(response.keys()))
+        return response
+
+    def _metadata_error(self, e: Exception) -> DocumentPortalException:
+        self.log.error("Metadata analysis failed", error=str(e))
+        return DocumentPortalException("Failed to analyze metadata", e)
+
     def analyze_metadata(self, document_text: str) -> dict:
         """
         Analyze a document's text and extract structured metadata and summary.
         """
         try:
             chain = self.prompt | self.llm | self.fixing_parser
+            with span("analyze_single"):
+                response = chain.invoke(self._metadata_inputs(document_text))
+            return self._metadata_result(response)
+        except Exception as e:
+            raise self._metadata_error(e) from e
 
-            self.log.info("Meta-data analysis chain initialized")
+    async def aanalyze_metadata(self, document_text: str) -> dict:
+        """
+        Awaitable analyze_metadata for the API, which runs on the event loop.
+        """
+        try:
+            chain = self.prompt | self.llm | self.fixing_parser
+            with span("analyze_single"):
+                response = await chain.ainvoke(self._metadata_inputs(document_text))
+            return self._metadata_result(response)
+        except Exception as e:
+            raise self._metadata_error(e) from e
 
-            response = chain.invoke(
-                {
-                    'format_instructions': self.parser.get_format_instructions(),
-                    'document_text': document_text
-                }
-            )
+    def needs_map_reduce(self, pages: List[str]) -> bool:
+        """
+        True when the document is too large to analyze in a single LLM call.
+        """
+        return sum(len(p) for p in pages) > self.single_call_max_chars
+
+    @staticmethod
+    def _pdf_date(value: Optional[str]) -> Optional[str]:
+        #PDF dates look like D:20240115093000+05'00'
+        m = re.match(r"^(?:D:)?(\d{4})(\d{2})?(\d{2})?", value or "")
+        if not m:
+            return None
+        return "-".join(part for part in m.groups() if part)
 
-            self.log.info("Metadata extraction successful", keys=list(response.keys()))
+    def _local_metadata(self, pdf_metadata: Dict[str, Any], page_count: int) -> Dict[str, Any]:
+        """
+        Deterministic fields taken from the PDF's own metadata instead of the LLM.
+        """
+        fields = {
+            "Title": (pdf_metadata.get("title") or "").strip(),
+            "Author": (pdf_metadata.get("author") or "").strip(),
+            "DateCreated": self._pdf_date(pdf_metadata.get("creationDate")),
+            "LastModifiedDate": self._pdf_date(pdf_metadata.get("modDate")),
+            "PageCount": pdf_metadata.get("page_count") or page_count,
+        }
+        return {k: v for k, v in fields.items() if v}
+
+    def _map_inputs(self, pages: List[str]) -> List[Dict[str, str]]:
+        inputs = []
+        for start in range(0, len(pages), self.window_pages):
+            window = pages[start:start + self.window_pages]
+            end = start + len(window)
+            inputs.append({
+                "section_label": f"pages {start + 1}-{end} of {len(pages)}",
+                "document_text": "\n".join(f"\n--- Page {start + i + 1} ---\n{p}" for i, p in enumerate(window)),
+            })
+        return inputs
+
+    def _reduce_inputs(self, map_inputs: List[Dict[str, str]], summaries: List[str], known: Dict[str, Any]) -> Dict[str, str]:
+        sections = "\n\n".join(f"[{inp['section_label']}]\n{summary}" for inp, summary in zip(map_inputs, summaries))
+        return {
+            "format_instructions": self.parser.get_format_instructions(),
+            "known_metadata": json.dumps(known, ensure_ascii=False),
+            "section_summaries": sections,
+        }
+
+    def analyze_document(self, pages: List[str], pdf_metadata: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Map-reduce analysis: fill deterministic fields from PDF metadata, summarize page windows
+        concurrently, then reduce the partial summaries into the Metadata schema.
+        """
+        try:
+            known = self._local_metadata(pdf_metadata or {}, len(pages))
+            map_inputs = self._map_inputs(pages)
+            with span("analyze_map"):
+                summaries = self.map_chain.batch(map_inputs, config={"max_concurrency": self.max_concurrency})
+            with span("analyze_reduce"):
+                response = self.reduce_chain.invoke(self._reduce_inputs(map_inputs, summaries, known))
+            response.update(known)
+            self.log.info("Map-reduce metadata extraction successful", windows=len(map_inputs), keys=list(response.keys()))
+            return response
+        except Exception as e:
+            self.log.error("Map-reduce metadata analysis failed", error=str(e))
+            raise DocumentPortalException("Failed to analyze metadata", e) from e
+
+    async def aanalyze_document(self, pages: List[str], pdf_metadata: Optional[Dict[str, Any]] = None) -> dict:
+        """
+        Async variant of analyze_document; latency is bounded by the slowest window plus the reduce call.
+        """
+        try:
+            known = self._local_metadata(pdf_metadata or {}, len(pages))
+            map_inputs = self._map_inputs(pages)
+            with span("analyze_map"):
+                summaries = await self.map_chain.abatch(map_inputs, config={"max_concurrency": self.max_concurrency})
+            with span("analyze_reduce"):
+                response = await self.reduce_chain.ainvoke(self._reduce_inputs(map_inputs, summaries, known))
+            response.update(known)
+            self.log.info("Map-reduce metadata extraction successful", windows=len(map_inputs), keys=list(response.keys()))
             return response
         except Exception as e:
-            self.log.error("Metadata analysis failed", error=str(e))
-            raise DocumentPortalException("Failed to analyze metadata", e) from e
\ No newline at end of file
+            self.log.error("Map-reduce metadata analysis failed", error=str(e))
+            raise DocumentPortalException("Failed to analyze metadata", e) from e
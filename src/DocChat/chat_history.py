@@ -0,0 +1,68 @@
+from __future__ import annotations
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+class ChatHistoryStore:
+    """
+    Persists chat turns per session in SQLite and returns a bounded window of recent messages.
+    """
+
+    def __init__(self, path: str = "cache/chat_history.sqlite", window_turns: int = 6, max_stored_turns: int = 50):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.window_turns = window_turns
+        self.max_stored_turns = max_stored_turns
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, session_id TEXT NOT NULL,"
+            " question TEXT NOT NULL, answer TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session_id, id)")
+        self._conn.commit()
+
+    def load(self, session_id: str) -> List[BaseMessage]:
+        """
+        Return the last window_turns turns of the session as alternating Human/AI messages.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT question, answer FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session_id, self.window_turns),
+            ).fetchall()
+        messages: List[BaseMessage] = []
+        for question, answer in reversed(rows):
+            messages.append(HumanMessage(content=question))
+            messages.append(AIMessage(content=answer))
+        return messages
+
+    def append(self, session_id: str, question: str, answer: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO turns (session_id, question, answer, created) VALUES (?, ?, ?, ?)",
+                (session_id, question, answer, time.time()),
+            )
+            #Keep only the most recent max_stored_turns turns per session
+            self._conn.execute(
+                "DELETE FROM turns WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM turns WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session_id, session_id, self.max_stored_turns),
+            )
+            self._conn.commit()
+
+    def clear(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+        log.info("Chat history cleared", session_id=session_id)
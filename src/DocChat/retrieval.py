@@ -1,31 +1,53 @@
 import sys
 import os
+import re
 from operator import itemgetter
-from typing import Optional, List
+from typing import Any, AsyncIterator, Dict, Optional, List
 
 from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain_community.vectorstores import FAISS
+from langchain_core.runnables import RunnableBranch, RunnablePassthrough
 
 from utils.model_loader import ModelLoader
+from utils.vectorstore_cache import get_vectorstore_cache
+from utils.lexical_index import make_cached_retriever
+from utils.sharded_index import is_sharded, make_sharded_retriever
+from utils.metrics import record_stage
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 from prompts.prompt_library import PROMPT_REGISTRY
 from model.models import PromptType
 
+#Pronouns that point back into the conversation ("does it cover water damage?")
+_REFERENCE_WORDS = re.compile(
+    r"\b(it|its|they|them|their|theirs|he|she|him|her|his|former|latter|aforementioned)\b",
+    re.IGNORECASE,
+)
+#Openings that continue the previous turn ("what about the warranty?", "and for Germany?")
+_FOLLOW_UP_START = re.compile(
+    r"^\W*(and|also|but|so|then|what about|how about|what else|same|this|that|these|those)\b",
+    re.IGNORECASE,
+)
 
 class ConversationRAG:
     def __init__(self, session_id: str, retriever=None):
         try:
             self.log = CustomLogger().get_logger(__name__)
             self.session_id = session_id
-            self.llm = ModelLoader().load_llm()
+            self.model_loader = ModelLoader()
+            self.llm = self.model_loader.load_llm()
+            chat_cfg = self.model_loader.config.get("chat") or {}
+            rewrite_key = chat_cfg.get("rewrite_llm")
+            self.rewrite_llm = self.model_loader.load_llm(rewrite_key) if rewrite_key else self.llm
+            self.rewrite_heuristic = bool(chat_cfg.get("rewrite_heuristic", True))
+            self.rewrite_max_words = int(chat_cfg.get("rewrite_max_words", 4))
             self.contextualize_prompt = PROMPT_REGISTRY[PromptType.CONTEXTUALIZE_QUESTION.value]
             self.qa_prompt = PROMPT_REGISTRY[PromptType.CONTEXT_QA.value]
             self.retriever = retriever
             self.chain = None
+            self.retrieval_chain = None
+            self.answer_chain = None
             if self.retriever is not None:
                 self._build_lcel_chain()
             self.log.info("Conversation RAG initialized", session_id=session_id)
@@ -35,22 +57,23 @@ class ConversationRAG:
             raise DocumentPortalException("Initialization error in ConversationRAG", sys)
         
 
-    def load_retriever_from_faiss(self, index_path: str):
+    def load_retriever_from_faiss(self, index_path: str, k: int = 5):
         """
-        Load a FAISS vectorstore from disk and convert to retriever.
+        Build a retriever over the FAISS index at index_path that takes the store from the
+        in-process LRU cache on each query; hybrid dense + BM25 when retriever.hybrid is enabled.
         """
         try:
-            embeddings = ModelLoader().load_embeddings()
+            embeddings = self.model_loader.load_embeddings()
             if not os.path.isdir(index_path):
                 raise FileNotFoundError(f"Index path {index_path} does not exist.")
-            
-            vectorstore = FAISS.load_local(
-                index_path,
-                embeddings,
-                allow_dangerous_deserialization= True # Only use this if you trust the source of the index
-            )
 
-            self.retriever = vectorstore.as_retriever(search_type = "similarity", search_kwargs = {"k": 5})
+            if is_sharded(index_path):
+                #Shards are resolved per query, so new shards are searched without reloading
+                self.retriever = make_sharded_retriever(index_path, embeddings, k, self.model_loader.config)
+            else:
+                #Loads (or validates) the store now; the retriever does not keep a reference to it
+                get_vectorstore_cache().get(index_path, embeddings)
+                self.retriever = make_cached_retriever(index_path, embeddings, k, self.model_loader.config)
             self._build_lcel_chain()
             self.log.info("Retriever loaded from FAISS", index_path=index_path, session_id=self.session_id)
             return self.retriever
@@ -58,26 +81,72 @@ class ConversationRAG:
             self.log.error(f"Failed to load retriever from FAISS", error=str(e))
             raise DocumentPortalException("Error loading retriever from FAISS", sys)
     
+    @staticmethod
+    def _payload(user_input: str, chat_history: Optional[list[BaseMessage]]) -> Dict[str, Any]:
+        return {
+            "input": user_input,
+            "chat_history": chat_history or []
+        }
+
+    def _answer(self, user_input: str, answer: str) -> str:
+        if not answer:
+            self.log.warning("No answer generated", user_input = user_input, session_id=self.session_id)
+            return "No answer generated"
+        self.log.info("Answer generated successfully", user_input=user_input, session_id=self.session_id, answer_preview=answer[:100])
+        return answer
+
+    def _invoke_error(self, e: Exception) -> DocumentPortalException:
+        self.log.error(f"Error invoking ConversationRAG", error=str(e))
+        return DocumentPortalException("Error invoking ConversationRAG", sys)
+
     def invoke(self, user_input: str, chat_history: Optional[list[BaseMessage]] = None) -> str:
         try:
-            chat_history = chat_history or []
-            payload = {
-                "input": user_input,
-                "chat_history": chat_history
+            return self._answer(user_input, self.chain.invoke(self._payload(user_input, chat_history)))
+        except Exception as e:
+            raise self._invoke_error(e)
+
+    async def ainvoke(self, user_input: str, chat_history: Optional[list[BaseMessage]] = None) -> str:
+        """
+        Awaits the chain, so concurrent queries overlap on the event loop.
+        """
+        try:
+            return self._answer(user_input, await self.chain.ainvoke(self._payload(user_input, chat_history)))
+        except Exception as e:
+            raise self._invoke_error(e)
+
+    async def astream(self, user_input: str, chat_history: Optional[list[BaseMessage]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream an answer as events: one "metadata" event with the retrieved sources once retrieval
+        finishes, then "token" events as the LLM generates, then a final "done" event.
+        """
+        try:
+            payload = self._payload(user_input, chat_history)
+            docs = await self.retrieval_chain.ainvoke(payload)
+            yield {
+                "type": "metadata",
+                "session_id": self.session_id,
+                "sources": [
+                    {"source": d.metadata.get("source"), "page": d.metadata.get("page")}
+                    for d in docs
+                ],
             }
-            answer = self.chain.invoke(payload)
-            if not answer:
-                self.log.warning("No answer generated", user_input = user_input, session_id=self.session_id)
-                return "No answer generated"
-            self.log.info("Answer generated successfully", user_input=user_input, session_id=self.session_id, answer_preview=answer[:100])
-            return answer
+
+            answer_parts: List[str] = []
+            async for token in self.answer_chain.astream({**payload, "context": self._format_docs(docs)}):
+                if token:
+                    answer_parts.append(token)
+                    yield {"type": "token", "content": token}
+
+            answer = "".join(answer_parts)
+            self.log.info("Answer streamed successfully", user_input=user_input, session_id=self.session_id, answer_preview=answer[:100])
+            yield {"type": "done", "answer": answer or "No answer generated"}
         except Exception as e:
-            self.log.error(f"Error invoking ConversationRAG", error=str(e))
-            raise DocumentPortalException("Error invoking ConversationRAG", sys)
+            self.log.error(f"Error streaming ConversationRAG", error=str(e))
+            raise DocumentPortalException("Error streaming ConversationRAG", sys)
 
     def _load_llm(self):
         try:
-            llm  = ModelLoader().load_llm()
+            llm  = self.model_loader.load_llm()
             if not llm:
                 raise ValueError("LLM could not be loaded")
             self.log.info("LLM loaded successfully", class_name=llm.__class__.__name__, session_id = self.session_id)
@@ -85,6 +154,30 @@ class ConversationRAG:
             self.log.error(f"Failed to load LLM", error=str(e))
             raise DocumentPortalException("Error during LLM loading", sys)
 
+    def needs_rewrite(self, payload: Dict[str, Any]) -> bool:
+        """
+        The question is only rewritten when there is chat history and (with rewrite_heuristic on)
+        it looks like a follow-up: very short, using a pronoun that refers back to earlier turns, or
+        opening with a continuation ("what about ...", "and ...").
+        """
+        if not payload.get("chat_history"):
+            return False
+        if not self.rewrite_heuristic:
+            return True
+        question = payload.get("input") or ""
+        return (len(question.split()) <= self.rewrite_max_words or bool(_REFERENCE_WORDS.search(question))
+                or bool(_FOLLOW_UP_START.match(question)))
+
+    def _timed(self, stage: str, runnable):
+        """
+        Attach a listener that logs how long stage took on every run.
+        """
+        def on_end(run):
+            seconds = (run.end_time - run.start_time).total_seconds()
+            record_stage(f"rag_{stage}", seconds)
+            self.log.info("Chain stage finished", stage=stage, session_id=self.session_id, seconds=round(seconds, 4))
+        return runnable.with_listeners(on_end=on_end)
+
     @staticmethod
     def _format_docs(docs):
         return "\n\n".join(
@@ -94,27 +187,31 @@ class ConversationRAG:
 
     def _build_lcel_chain(self):
         try:
-            #1. Rewrite question using chat history
+            #1. Rewrite question using chat history; first turns and self-contained questions skip the LLM call
             question_rewriter = (
                 {"input": itemgetter("input"), "chat_history": itemgetter("chat_history")}
                 | self.contextualize_prompt
-                | self.llm
+                | self.rewrite_llm
                 | StrOutputParser()
             )
+            standalone_question = RunnableBranch(
+                (self.needs_rewrite, self._timed("rewrite", question_rewriter)),
+                itemgetter("input"),
+            )
 
             #2. Retrieve docs for rewritten question
-            retrieve_docs = question_rewriter| self.retriever | self._format_docs
+            self.retrieval_chain = standalone_question | self._timed("retrieve", self.retriever)
+            retrieve_docs = self.retrieval_chain | self._format_docs
 
             #3. Feed Context + Original input + chat history into answer prompt
+            self.answer_chain = self._timed("answer", self.qa_prompt | self.llm | StrOutputParser())
             self.chain = (
                 {
                     "context": retrieve_docs,
                     "input": itemgetter("input"),
                     "chat_history": itemgetter("chat_history"),
                 }
-                | self.qa_prompt
-                | self.llm
-                | StrOutputParser()
+                | self.answer_chain
             )
             self.log.info("LCEL chain built successfully", session_id=self.session_id)
         except Exception as e:
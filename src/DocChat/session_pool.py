@@ -0,0 +1,105 @@
+from __future__ import annotations
+import os
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+
+from src.DocChat.retrieval import ConversationRAG
+from src.DocChat.chat_history import ChatHistoryStore
+from utils.model_loader import MODEL_REGISTRY
+from utils.concurrency import lazy_singleton
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+PoolKey = Tuple[Optional[str], str, int]
+
+@dataclass
+class _PooledSession:
+    rag: ConversationRAG
+    last_used: float = field(default_factory=time.monotonic)
+
+class ConversationSessionPool:
+    """
+    Keeps a ready ConversationRAG (chain + retriever) per (session, index, k) with LRU and
+    idle-timeout eviction. Pooled retrievers do not hold FAISS stores: they take them from the
+    vector store cache per query, so its memory budget applies and index changes are picked up.
+    """
+
+    def __init__(self, max_sessions: int = 64, idle_timeout_seconds: float = 1800):
+        self.max_sessions = max_sessions
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._sessions: "OrderedDict[PoolKey, _PooledSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str], index_dir: str, k: int = 5) -> ConversationRAG:
+        key: PoolKey = (session_id, os.path.abspath(index_dir), k)
+        with self._lock:
+            self._evict_idle()
+            entry = self._sessions.get(key)
+            if entry is not None:
+                self._sessions.move_to_end(key)
+                entry.last_used = time.monotonic()
+                return entry.rag
+
+        rag = ConversationRAG(session_id = session_id)
+        rag.load_retriever_from_faiss(index_dir, k=k)
+
+        with self._lock:
+            self._sessions[key] = _PooledSession(rag=rag)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                log.info("Chat session evicted from pool", session_id=evicted[0])
+        return rag
+
+    def _evict_idle(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._sessions.items() if now - e.last_used > self.idle_timeout_seconds]:
+            del self._sessions[key]
+            log.info("Idle chat session evicted from pool", session_id=key[0])
+
+    def discard(self, session_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._sessions if k[0] == session_id]:
+                del self._sessions[key]
+
+    def session_ids(self) -> Set[str]:
+        """
+        Sessions with a pooled pipeline that has not yet passed the idle timeout.
+        """
+        with self._lock:
+            self._evict_idle()
+            return {k[0] for k in self._sessions if k[0]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sessions": len(self._sessions)}
+
+def _chat_config() -> Dict[str, Any]:
+    return MODEL_REGISTRY.get_config().get("chat") or {}
+
+@lazy_singleton
+def get_session_pool() -> ConversationSessionPool:
+    """
+    Process-wide pool configured under chat in config.yaml.
+    """
+    cfg = _chat_config()
+    return ConversationSessionPool(
+        max_sessions = int(cfg.get("max_sessions", 64)),
+        idle_timeout_seconds = float(cfg.get("idle_timeout_seconds", 1800)),
+    )
+
+@lazy_singleton
+def get_history_store() -> ChatHistoryStore:
+    """
+    Process-wide chat history store configured under chat in config.yaml.
+    """
+    cfg = _chat_config()
+    return ChatHistoryStore(
+        path = os.getenv("CHAT_HISTORY_PATH", cfg.get("history_path", "cache/chat_history.sqlite")),
+        window_turns = int(cfg.get("history_window_turns", 6)),
+        max_stored_turns = int(cfg.get("max_stored_turns", 50)),
+    )
@@ -1,18 +1,20 @@
 import sys
-from dotenv import load_dotenv
+from typing import Dict, List, Tuple
 import pandas as pd
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 from model.models import SummaryResponse, PromptType
 from prompts.prompt_library import PROMPT_REGISTRY
 from utils.model_loader import ModelLoader
+from utils.page_diff import PageDiff, align_pages, IDENTICAL, ADDED, REMOVED
+from utils.metrics import span
+from utils.concurrency import run_cpu
 from langchain_core.output_parsers import JsonOutputParser
 from langchain.output_parsers import OutputFixingParser
 
 
 class DocumentComparer:
     def __init__(self):
-        load_dotenv()
         self.log = CustomLogger().get_logger(__name__)
         self.loader = ModelLoader()
         self.llm = self.loader.load_llm()
@@ -20,26 +22,138 @@ class DocumentComparer:
         self.fixing_parser = OutputFixingParser.from_llm(parser = self.parser, llm = self.llm)
         self.prompt = PROMPT_REGISTRY[PromptType.DOCUMENT_COMPARISON.value]
         self.chain = self.prompt | self.llm | self.parser #| self.fixing_parser
+        self.diff_prompt = PROMPT_REGISTRY[PromptType.DOCUMENT_COMPARISON_DIFF.value]
+        self.diff_chain = self.diff_prompt | self.llm | self.parser
+
+        comparison_cfg = self.loader.config.get("comparison") or {}
+        self.similarity_threshold = float(comparison_cfg.get("similarity_threshold", 0.5))
+        self.max_diff_chars = int(comparison_cfg.get("max_diff_chars_per_call", 24000))
+        self.match_window = int(comparison_cfg.get("match_window", 3))
+        self.max_page_comparisons = int(comparison_cfg.get("max_page_comparisons", 2000))
+        self.max_concurrency = int(comparison_cfg.get("max_concurrency", 4))
         self.log.info("DocumentComparer initialized with LLM and parser.", model = self.llm)
 
+    def _comparison_inputs(self, combined_docs: str) -> Dict[str, str]:
+        self.log.info("Starting document comparison", input_chars = len(combined_docs))
+        return {
+            "combined_docs": combined_docs,
+            "format_instruction": self.parser.get_format_instructions()
+        }
+
+    def _comparison_result(self, response: list) -> pd.DataFrame:
+        self.log.info("Document comparison completed", rows = len(response or []))
+        #Process the response and return a DataFrame
+        return self._format_response(response)
+
+    def _comparison_error(self, e: Exception, method: str) -> DocumentPortalException:
+        self.log.error(f"Error in {method}: {e}")
+        return DocumentPortalException("Error while comparing documents.", sys)
+
     def compare_documents(self, combined_docs: str) -> pd.DataFrame:
         """
         Compares two documents and returns a structured comparison.
         """
         try:
-            inputs = {
-                "combined_docs": combined_docs,
-                "format_instruction": self.parser.get_format_instructions()
-            }
-            self.log.info("Starting document comparison", inputs = inputs)
-            response = self.chain.invoke(inputs)
-            self.log.info("Document comparison completed", response = response)
-            
-            #Process the response and return a DataFrame
-            return self._format_response(response)
+            return self._comparison_result(self.chain.invoke(self._comparison_inputs(combined_docs)))
+        except Exception as e:
+            raise self._comparison_error(e, "compare_documents")
+
+    async def acompare_documents(self, combined_docs: str) -> pd.DataFrame:
+        """
+        compare_documents for async callers; the LLM call is awaited.
+        """
+        try:
+            return self._comparison_result(await self.chain.ainvoke(self._comparison_inputs(combined_docs)))
+        except Exception as e:
+            raise self._comparison_error(e, "acompare_documents")
+
+    def _prefilter(self, ref_pages: List[str], act_pages: List[str]) -> Tuple[List[PageDiff], List[Dict[str, str]]]:
+        """
+        Align pages locally and batch the diff hunks of non-identical pages into LLM inputs
+        of at most max_diff_chars characters each.
+        """
+        diffs = align_pages(ref_pages, act_pages, similarity_threshold = self.similarity_threshold,
+                            window = self.match_window, max_comparisons = self.max_page_comparisons)
+        batches: List[Dict[str, str]] = []
+        current: List[str] = []
+        size = 0
+        for d in diffs:
+            if d.status == IDENTICAL:
+                continue
+            section = f"=== Page {d.label} ===\n{d.diff[:self.max_diff_chars]}"
+            if current and size + len(section) > self.max_diff_chars:
+                batches.append(self._diff_inputs(current))
+                current, size = [], 0
+            current.append(section)
+            size += len(section)
+        if current:
+            batches.append(self._diff_inputs(current))
+
+        changed = sum(1 for d in diffs if d.status != IDENTICAL)
+        self.log.info("Page prefilter complete", pages = len(diffs), unchanged = len(diffs) - changed,
+                      changed = changed, llm_calls = len(batches))
+        return diffs, batches
+
+    def _diff_inputs(self, sections: List[str]) -> Dict[str, str]:
+        return {
+            "combined_docs": "\n\n".join(sections),
+            "format_instruction": self.parser.get_format_instructions()
+        }
+
+    def _merge_page_results(self, diffs: List[PageDiff], responses: List[list]) -> pd.DataFrame:
+        llm_changes: Dict[str, str] = {}
+        for response in responses:
+            for row in response or []:
+                if isinstance(row, dict) and "Page" in row:
+                    llm_changes[str(row["Page"]).strip()] = row.get("changes", "")
+
+        rows = []
+        for d in diffs:
+            if d.status == IDENTICAL:
+                changes = "NO CHANGE"
+            elif d.label in llm_changes:
+                changes = llm_changes[d.label]
+            elif d.status == REMOVED:
+                changes = "Page removed from the actual document"
+            elif d.status == ADDED:
+                changes = "Page added in the actual document"
+            else:
+                lines = d.diff.splitlines()
+                added = sum(1 for l in lines if l.startswith("+") and not l.startswith("+++"))
+                removed = sum(1 for l in lines if l.startswith("-") and not l.startswith("---"))
+                changes = f"Content changed: {added} line(s) added, {removed} line(s) removed"
+            rows.append({"Page": d.label, "changes": changes})
+        return self._format_response(rows)
+
+    def compare_pages(self, ref_pages: List[str], act_pages: List[str]) -> pd.DataFrame:
+        """
+        Compare documents page by page. Identical pages are reported as 'NO CHANGE' locally;
+        only the diff hunks of changed pages are sent to the LLM.
+        """
+        try:
+            with span("compare_prefilter"):
+                diffs, batches = self._prefilter(ref_pages, act_pages)
+            with span("compare_llm"):
+                responses = self.diff_chain.batch(batches, config={"max_concurrency": self.max_concurrency}) if batches else []
+            return self._merge_page_results(diffs, responses)
+        except Exception as e:
+            self.log.error(f"Error in compare_pages: {e}")
+            raise DocumentPortalException("Error while comparing documents.", sys)
 
+    async def acompare_pages(self, ref_pages: List[str], act_pages: List[str]) -> pd.DataFrame:
+        """
+        compare_pages for async callers: page alignment runs on the CPU executor and at most
+        max_concurrency diff batches are sent to the LLM at once.
+        """
+        try:
+            with span("compare_prefilter"):
+                diffs, batches = await run_cpu(self._prefilter, ref_pages, act_pages)
+            with span("compare_llm"):
+                responses = (await self.diff_chain.abatch(batches, config={"max_concurrency": self.max_concurrency})
+                             if batches else [])
+            return self._merge_page_results(diffs, responses)
         except Exception as e:
-            self.log.error(f"Error in compare_documents: {e}")
+            self.log.error(f"Error in acompare_pages: {e}")
             raise DocumentPortalException("Error while comparing documents.", sys)
 
     def _format_response(self, response_parsed: list[dict]) -> pd.DataFrame:
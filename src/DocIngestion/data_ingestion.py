@@ -7,9 +7,8 @@ import hashlib
 import shutil
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Iterable, Optional, List, Dict, Any
+from typing import Callable, Iterable, Iterator, Optional, List, Dict, Any
 
-import fitz
 from langchain.schema import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, Docx2txtLoader
@@ -18,12 +17,25 @@ from langchain_community.vectorstores import FAISS
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 from utils.model_loader import ModelLoader
+from utils.vectorstore_cache import get_vectorstore_cache
+from utils.embedding_cache import with_embedding_cache
+from utils.embedding_executor import with_batching
+from utils.faiss_index import index_config, apply_search_params, upgrade_index
+from utils.pdf_extractor import get_pdf_extractor
+from utils.faiss_store import store_exists, load_vectorstore, create_vectorstore, save_vectorstore, storage_mode
+from utils.lexical_index import LexicalIndex, hybrid_config, make_retriever
+from utils.sharded_index import MANIFEST_FILE, shards_root, sharding_config, make_sharded_retriever
+from utils.metrics import span, count_items
 
-from utils.file_io import _session_id, save_uploaded_files
-from utils.document_ops import load_documents, concat_for_analysis, concat_for_comparison
+from utils.file_io import _session_id, save_uploaded_files, remove_saved_files, UploadBudget, UploadLimitExceeded
+from utils.document_ops import load_documents, read_pdf_pages, join_pages, concat_for_analysis, concat_for_comparison
 
 SUPPORTED_EXTENSIONS = {'.pdf', '.txt', '.docx'}
 
+#progress(stage, **counts) callback used to report ingestion progress (see ingestion_jobs)
+ProgressCallback = Callable[..., None]
+EMBED_PROGRESS_SLICE = 512 #chunks embedded between progress reports
+
 class FaissManager:
     def __init__(self, index_dir = Path, model_loader: Optional[ModelLoader] = None):
         self.index_dir = Path(index_dir)
@@ -39,61 +51,220 @@ class FaissManager:
                 self._meta = {"rows": {}}
         
         self.model_loader = model_loader or ModelLoader()
-        self.emb = self.model_loader.load_embeddings()
+        #Cache outside the batch executor so only cache misses are sent to the provider
+        self.emb = with_embedding_cache(with_batching(self.model_loader.load_embeddings()))
+        self.index_cfg = index_config(self.model_loader.config)
+        self.storage = storage_mode(self.model_loader.config)
+        hybrid = hybrid_config(self.model_loader.config)
+        self.lexical: Optional[LexicalIndex] = None
+        if hybrid.get("enabled", False):
+            self.lexical = LexicalIndex(self.index_dir, k1=float(hybrid.get("bm25_k1", 1.5)),
+                                        b=float(hybrid.get("bm25_b", 0.75)))
         self.vs: Optional[FAISS] = None
 
     def _exists(self) -> bool:
-        return (self.index_dir / "index.faiss").exists() and (self.index_dir / "index.pkl").exists()
+        return store_exists(self.index_dir)
 
     @staticmethod
     def _fingerprint(text: str, md: Dict[str, Any]) -> str: #for deduplication of data
+        # Keyed on the file's content hash rather than its saved path (uploads get a random name), so
+        # re-uploading a file is deduplicated while identical text in different files is kept per file;
+        # chunks of one file are told apart by row_id, or by their content when there is none.
+        src = md.get("source_sha256") or md.get("source") or md.get("file_path")
+        rid = md.get("row_id")
+        content = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if src is None:
+            return content
+        return f"{src}::{content if rid is None else rid}"
+
+    @staticmethod
+    def _legacy_fingerprint(md: Dict[str, Any]) -> Optional[str]:
+        """
+        Key the chunk's file was recorded under by earlier versions: "source::row_id", or
+        "source::" for every chunk of a file without row ids (the whole file was indexed with it).
+        Chunks without a source were keyed by content hash, as they still are.
+        """
         src = md.get("source") or md.get("file_path")
+        if src is None:
+            return None
         rid = md.get("row_id")
-        if src is not None:
-            return f"{src}::{'' if rid is None else rid}"
-        return hashlib.sha256(text.encode('utf-8')).hexdigest()   
+        return f"{src}::{'' if rid is None else rid}"
 
-    def _save_meta(self):
-        self.meta_path.write_text(json.dumps(self._meta, ensure_ascii = False, indent = 2), encoding = 'utf-8')
-    
-    def add_document(self, docs: List[Document]):
-        if self.vs is None:
-            raise RuntimeError("Call load_or_create() before add_documents_indempotent()")
-        
+    @classmethod
+    def dedupe_against(cls, rows: Dict[str, Any], docs: List[Document]):
+        """
+        Drop chunks whose key (current or legacy) is in rows or repeated within docs.
+        """
         new_docs: List[Document] = []
-
+        keys: List[str] = []
+        seen = set()
         for d in docs:
-            key = self._fingerprint(d.page_content, d.metadata or {})
-            if key in self._meta["rows"]:
+            md = d.metadata or {}
+            key = cls._fingerprint(d.page_content, md)
+            if key in rows or key in seen or cls._legacy_fingerprint(md) in rows:
                 continue
-            self._meta["rows"][key] = True
+            seen.add(key)
+            keys.append(key)
             new_docs.append(d)
-        
-        if new_docs:
-            self.vs.add_documents(new_docs)
-            self.vs.save_local(str(self.index_dir))
-            self._save_meta()
+        return new_docs, keys
+
+    def _save_meta(self):
+        self.meta_path.write_text(json.dumps(self._meta, ensure_ascii = False, indent = 2), encoding = 'utf-8')
+
+    def _dedupe(self, docs: List[Document]):
+        """
+        Drop chunks already in the index or repeated within docs, before anything is embedded.
+        """
+        return self.dedupe_against(self._meta["rows"], docs)
+
+    def add_document(self, docs: List[Document], progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Idempotently add docs to the index (creating it if needed).
+        Dedup happens before embedding, every new chunk is embedded exactly once,
+        and the index and metadata are written once per call.
+        """
+        progress = progress or (lambda stage, **counts: None)
+        new_docs, keys = self._dedupe(docs)
+        if self.vs is None and self._exists():
+            self.load_or_create()
+        self._backfill_lexical()
+
+        if not new_docs:
+            return 0
 
+        texts = [d.page_content for d in new_docs]
+        metadatas = [d.metadata or {} for d in new_docs]
+        vectors: List[List[float]] = []
+        progress("embedding", chunks_new = len(texts), chunks_embedded = 0)
+        with span("embed"):
+            for start in range(0, len(texts), EMBED_PROGRESS_SLICE):
+                vectors.extend(self.emb.embed_documents(texts[start:start + EMBED_PROGRESS_SLICE]))
+                progress("embedding", chunks_embedded = len(vectors))
+        count_items("embed", len(texts))
+        text_embeddings = list(zip(texts, vectors))
+
+        progress("indexing")
+
+        with span("faiss_add"):
+            if self.vs is None:
+                self.vs = create_vectorstore(self.index_dir, self.emb, text_embeddings, metadatas, self.storage)
+            else:
+                self.vs.add_embeddings(text_embeddings, metadatas = metadatas)
+            #Switch to the configured HNSW/IVF/PQ index once there are enough vectors to train it
+            self.vs.index = upgrade_index(self.vs.index, self.index_cfg)
+
+        with span("index_save"):
+            save_vectorstore(self.vs, self.index_dir)
+            if self.lexical is not None:
+                self.lexical.add(new_docs, keys)
+        for key in keys:
+            self._meta["rows"][key] = True
+        self._save_meta()
+        get_vectorstore_cache().invalidate(self.index_dir)
+        progress("index_saved", index_saved = True)
         return len(new_docs)
 
+    def _backfill_lexical(self) -> None:
+        """
+        Build the lexical index from the docstore when hybrid search is enabled for an index
+        that was created without it.
+        """
+        if self.lexical is None or self.vs is None or len(self.lexical) > 0 or self.vs.index.ntotal == 0:
+            return
+        docs = [self.vs.docstore.search(i) for i in self.vs.index_to_docstore_id.values()]
+        docs = [d for d in docs if isinstance(d, Document)]
+        self.lexical.add(docs, [self._fingerprint(d.page_content, d.metadata or {}) for d in docs])
+
     def load_or_create(self, texts: Optional[List[str]] = None, metadatas: Optional[List[dict]] = None):
         if self._exists():
-            self.vs = FAISS.load_local(
-                str(self.index_dir),
-                embeddings = self.emb,
-                allow_dangerous_deserialization = True
-            )
+            self.vs = load_vectorstore(self.index_dir, self.emb)
+            apply_search_params(self.vs.index, self.index_cfg)
             return self.vs
         if not texts:
             raise DocumentPortalException("No texts provided for FAISS index creation", sys)
-        self.vs = FAISS.from_texts(
-            texts = texts,
-            embedding = self.emb,
-            metadatas = metadatas or []
-        )
-        self.vs.save_local(str(self.index_dir))
+        metadatas = metadatas or [{} for _ in texts]
+        self.add_document([Document(page_content = t, metadata = m) for t, m in zip(texts, metadatas)])
         return self.vs
 
+class ShardedFaissManager:
+    """
+    Shared index split into fixed-size shards under <index_dir>/_shards. Each shard is a regular
+    FaissManager index; new chunks only go to the active (newest) shard, and a new shard is
+    started once it holds max_vectors_per_shard chunks. The manifest only holds shard names and
+    counts; dedup reads each shard's own ingested_meta.json, so ingesting rewrites nothing but the
+    active shard and the manifest.
+    """
+
+    def __init__(self, index_dir = Path, model_loader: Optional[ModelLoader] = None):
+        self.log = CustomLogger().get_logger(__name__)
+        self.index_dir = Path(index_dir)
+        self.root = shards_root(self.index_dir)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.model_loader = model_loader or ModelLoader()
+        cfg = sharding_config(self.model_loader.config)
+        self.max_vectors = int(cfg.get("max_vectors_per_shard", 50000))
+
+        self.manifest_path = self.root / MANIFEST_FILE
+        self._manifest: Dict[str, Any] = {"shards": {}}
+        if self.manifest_path.exists():
+            manifest = json.loads(self.manifest_path.read_text(encoding = 'utf-8'))
+            self._manifest["shards"] = manifest.get("shards") or {}
+        else:
+            self._save_manifest()
+
+    def _save_manifest(self) -> None:
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._manifest, ensure_ascii = False), encoding = 'utf-8')
+        os.replace(tmp, self.manifest_path)
+
+    def _active_shard(self) -> str:
+        shards = self._manifest["shards"]
+        if shards:
+            name = max(shards)
+            if shards[name] < self.max_vectors:
+                return name
+        name = f"shard_{len(shards):05d}"
+        shards[name] = 0
+        return name
+
+    def _indexed_rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        Dedup keys of each shard in turn, starting with an index saved in index_dir before
+        sharding was enabled (it stays searchable, so its chunks count as indexed).
+        """
+        for d in [self.index_dir, *sorted(self.root / name for name in self._manifest["shards"])]:
+            meta = d / "ingested_meta.json"
+            if meta.exists():
+                try:
+                    yield (json.loads(meta.read_text(encoding = 'utf-8')) or {}).get("rows") or {}
+                except Exception as e:
+                    self.log.warning("Unreadable shard metadata skipped", path = str(meta), error = str(e))
+
+    def add_document(self, docs: List[Document], progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Idempotently add docs, filling the active shard and rolling over to new shards as they fill up.
+        """
+        progress = progress or (lambda stage, **counts: None)
+        pending, _ = FaissManager.dedupe_against({}, docs)
+        for rows in self._indexed_rows():
+            if not pending:
+                break
+            pending, _ = FaissManager.dedupe_against(rows, pending)
+
+        added = 0
+        while pending:
+            name = self._active_shard()
+            free = self.max_vectors - self._manifest["shards"][name]
+            batch, pending = pending[:free], pending[free:]
+            #Only the active shard is loaded and rewritten
+            count = FaissManager(self.root / name, self.model_loader).add_document(batch, progress = progress)
+            self._manifest["shards"][name] += count
+            self._save_manifest()
+            added += count
+            self.log.info("Shard updated", shard = name, added = count, vectors = self._manifest["shards"][name])
+        progress("index_saved", shards = len(self._manifest["shards"]))
+        return added
+
 class DocHandler:
     def __init__(self, data_dir: Optional[str] = None, session_id: Optional[str] = None):
         self.log = CustomLogger().get_logger(__name__)
@@ -111,30 +282,29 @@ class DocHandler:
             if not filename.lower().endswith(".pdf"):
                 raise ValueError("Invalid file type. Only PDFs are allowed.")
             save_path = os.path.join(self.session_path, filename)
-            with open(save_path, 'wb') as f:
-                if hasattr(uploaded_file, "read"):
-                    f.write(uploaded_file.read())
-                else:
-                    f.write(uploaded_file.getbuffer())
-            self.log.info("PDF saved successfully", file = filename, save_path = save_path, session_id = self.session_id)
+            size, sha256 = UploadBudget().save(uploaded_file, Path(save_path))
+            self.log.info("PDF saved successfully", file = filename, save_path = save_path, session_id = self.session_id,
+                          bytes = size, sha256 = sha256)
             return save_path
+        except UploadLimitExceeded:
+            raise
         except Exception as e:
             self.log.error("Failed to save PDF", error=str(e), session_id = self.session_id)
             raise DocumentPortalException("Error saving PDF", e)
 
     def read_pdf(self, pdf_path: str) -> str:
+        pages = read_pdf_pages(pdf_path, self.session_id)
+        return join_pages(pages)
+
+    def read_pages(self, pdf_path: str) -> List[str]:
+        return read_pdf_pages(pdf_path, self.session_id)
+
+    def read_pdf_metadata(self, pdf_path: str) -> Dict[str, Any]:
         try:
-            text_chunks = []
-            with fitz.open(pdf_path) as doc:
-                for page_num in range(doc.page_count):
-                    page = doc.load_page(page_num)
-                    text_chunks.append(f"\n--- Page {page_num + 1} ---\n{page.get_text()}")
-            text = "\n".join(text_chunks)
-            self.log.info("PDF read successfully", pdf_path = pdf_path, session_id = self.session_id, pages = len(text_chunks))
-            return text
+            return get_pdf_extractor().read_metadata(pdf_path)
         except Exception as e:
-            self.log.error("Failed to read PDF", error=str(e), pdf_path = pdf_path, session_id = self.session_id)
-            raise DocumentPortalException(f"Error reading PDF: {pdf_path}", e)
+            self.log.error("Failed to read PDF metadata", error=str(e), pdf_path = pdf_path, session_id = self.session_id)
+            raise DocumentPortalException(f"Error reading PDF metadata: {pdf_path}", e)
 
 class DocumentComparator:
     def __init__(self, base_dir: str = "data/document_comparison", session_id: Optional[str] = None):
@@ -149,36 +319,36 @@ class DocumentComparator:
         try:
             ref_path = self.session_path / reference_file.name
             act_path = self.session_path / actual_file.name
-            for fobj, out in ((reference_file, ref_path), (actual_file, act_path)):
+            budget = UploadBudget()
+            for fobj in (reference_file, actual_file):
                 if not fobj.name.lower().endswith(".pdf"):
                     raise ValueError("Only PDF files are supported for comparison.")
-                with open(out, 'wb') as f:
-                    if hasattr(fobj, "read"):
-                        f.write(fobj.read())
-                    else:
-                        f.write(fobj.getbuffer())
-            self.log.info("Files saved for comparison", reference_file = str(ref_path), actual_file = str(act_path), session_id = self.session_id)
-            return ref_path, act_path      
+            saved: List[Path] = []
+            try:
+                for fobj, out in ((reference_file, ref_path), (actual_file, act_path)):
+                    budget.save(fobj, out)
+                    saved.append(out)
+            except BaseException:
+                remove_saved_files(saved)
+                raise
+            self.log.info("Files saved for comparison", reference_file = str(ref_path), actual_file = str(act_path),
+                          session_id = self.session_id, bytes = budget.used)
+            return ref_path, act_path
+        except UploadLimitExceeded:
+            raise
         except Exception as e:
             self.log.error("Failed to save uploaded files", error=str(e), session_id = self.session_id)
             raise DocumentPortalException("Error saving uploaded files", e)
 
     def read_pdf(self, pdf_path: Path) -> str:
-        try:
-            with fitz.open(pdf_path) as doc:
-                if doc.is_encrypted:
-                    raise ValueError(f"PDF is encrypted: {pdf_path.name}")
-                parts = []
-                for page_num in range(doc.page_count):
-                    page = doc.load_page(page_num)
-                    text = page.get_text()
-                    if text.strip():
-                        parts.append(f"\n--- Page {page_num + 1} ---\n{text}")
-            self.log.info("PDF read successfully", file = str(pdf_path), session_id = self.session_id, pages = len(parts))
-            return "\n".join(parts)
-        except Exception as e:
-            self.log.error("Failed to read PDF", error=str(e), file = str(pdf_path), session_id = self.session_id)
-            raise DocumentPortalException(f"Error reading PDF", e)
+        pages = read_pdf_pages(pdf_path, self.session_id)
+        return "\n".join(f"\n--- Page {i + 1} ---\n{text}" for i, text in enumerate(pages) if text.strip())
+
+    def read_pages(self, pdf_path: Path) -> List[str]:
+        """
+        Return the per-page text of a PDF (used by the page-level comparison prefilter).
+        """
+        return read_pdf_pages(pdf_path, self.session_id)
 
     def combine_documents(self) -> str:
         try:
@@ -241,48 +411,94 @@ class ChatIngestor:
             return d
         return base
 
+    @span("split")
     def _split(self, docs: List[Document],
                chunk_size = 1000,
                chunk_overlap = 200) -> List[Document]:
         splitter = RecursiveCharacterTextSplitter(chunk_size = chunk_size,
                                                   chunk_overlap = chunk_overlap)
         chunks = splitter.split_documents(docs)
+        count_items("split", len(chunks))
         self.log.info("Documents split into chunks", total_chunks = len(chunks), 
                       chunk_size = chunk_size, chunk_overlap = chunk_overlap,)
         return chunks
 
-    def build_retriever(self,
-                        uploaded_files: Iterable,
-                        *,
-                        chunk_size: int = 1000,
-                        chunk_overlap: int = 200,
-                        k: int = 5):
+    def save_files(self, uploaded_files: Iterable) -> List[Path]:
+        """
+        Save uploads into the session's temp dir (the part of ingestion tied to the request).
+        """
+        try:
+            return save_uploaded_files(uploaded_files, self.temp_dir)
+        except UploadLimitExceeded:
+            raise
+        except Exception as e:
+            self.log.error("Failed to save uploaded files", error=str(e), session_id=self.session_id)
+            raise DocumentPortalException("Error saving uploaded files", e)
+
+    def index_files(self,
+                    paths: List[Path],
+                    *,
+                    chunk_size: int = 1000,
+                    chunk_overlap: int = 200,
+                    progress: Optional[ProgressCallback] = None) -> int:
+        """
+        Parse, split, embed and index already saved files, reporting each stage to progress.
+        Returns the number of chunks added (duplicates of indexed chunks are skipped).
+        """
+        progress = progress or (lambda stage, **counts: None)
         try:
-            paths = save_uploaded_files(uploaded_files, self.temp_dir)
-            docs = load_documents(paths)
+            progress("parsing", files_total = len(paths), files_parsed = 0)
+            docs = load_documents(paths, on_file_parsed = lambda done, total: progress("parsing", files_parsed = done))
             if not docs:
                 raise ValueError("No valid documents loaded")
 
+            progress("splitting", pages = len(docs))
             chunks = self._split(docs, chunk_size, chunk_overlap)
-            fm = FaissManager(self.faiss_dir, self.model_loader)
-
-            texts = [c.page_content for c in chunks]
-            metas = [c.metadata for c in chunks]
+            progress("splitting", chunks_total = len(chunks))
+            sharded = self._sharded()
+            if sharded:
+                fm = ShardedFaissManager(self.faiss_dir, self.model_loader)
+            else:
+                fm = FaissManager(self.faiss_dir, self.model_loader)
 
-            try:
-                vs = fm.load_or_create(texts = texts, metadatas = metas)
-            except Exception:
-                vs = fm.load_or_create(texts = texts, metadatas = metas)
-
-            added = fm.add_document(chunks)
+            added = fm.add_document(chunks, progress = progress)
             self.log.info("FAISS index updated",
                           index_path = str(self.faiss_dir),
-                          added = added)
-            return vs.as_retriever(search_type = "similarity", search_kwargs = {"k": k})
-        
+                          added = added,
+                          skipped = len(chunks) - added,
+                          sharded = sharded)
+            progress("done", chunks_added = added, chunks_skipped = len(chunks) - added)
+            return added
+
+        except Exception as e:
+            self.log.error("Failed to index files", error=str(e), session_id=self.session_id)
+            raise DocumentPortalException("Error indexing files", e)
+
+    def _sharded(self) -> bool:
+        #The shared index (no session dirs) is sharded so each ingestion only rewrites one shard
+        return not self.use_session and sharding_config(self.model_loader.config).get("enabled", False)
+
+    def load_retriever(self, k: int = 5):
+        """
+        Retriever over this ingestor's index as it is on disk.
+        """
+        try:
+            embeddings = self.model_loader.load_embeddings()
+            if self._sharded():
+                return make_sharded_retriever(self.faiss_dir, embeddings, k, self.model_loader.config)
+            vs = get_vectorstore_cache().get(self.faiss_dir, embeddings)
+            return make_retriever(vs, self.faiss_dir, k, self.model_loader.config)
         except Exception as e:
             self.log.error("Failed to build retriever", error=str(e), session_id=self.session_id)
             raise DocumentPortalException("Error building retriever", e)
-        self.log.info("Building retriever", session_id = self.session_id)
-       
+
+    def build_retriever(self,
+                        uploaded_files: Iterable,
+                        *,
+                        chunk_size: int = 1000,
+                        chunk_overlap: int = 200,
+                        k: int = 5):
+        paths = self.save_files(uploaded_files)
+        self.index_files(paths, chunk_size = chunk_size, chunk_overlap = chunk_overlap)
+        return self.load_retriever(k)
         
\ No newline at end of file
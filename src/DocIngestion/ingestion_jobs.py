@@ -0,0 +1,159 @@
+from __future__ import annotations
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+from utils.model_loader import MODEL_REGISTRY
+from utils.concurrency import lazy_singleton
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+@dataclass
+class IngestionJob:
+    """State of one background ingestion; progress holds the latest per-stage counters."""
+    job_id: str
+    session_id: Optional[str]
+    lane: str
+    status: str = QUEUED
+    stage: str = QUEUED
+    progress: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": dict(self.progress),
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+class IngestionJobManager:
+    """
+    Runs ingestion jobs on a local thread pool. Jobs in the same lane (the target index
+    directory) run one after another in submission order; different lanes run in parallel.
+    """
+
+    def __init__(self, max_workers: int = 4, max_finished_jobs: int = 1000):
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docportal-ingest")
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._queues: Dict[str, Deque[tuple]] = {}
+        self._active_lanes: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def submit(self, lane: str, session_id: Optional[str], fn: Callable[..., Any]) -> IngestionJob:
+        """
+        Queue fn(progress) in lane and return the job immediately. fn receives a
+        progress(stage, **counts) callback that updates the job.
+        """
+        job = IngestionJob(job_id=uuid.uuid4().hex, session_id=session_id, lane=lane)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._queues.setdefault(lane, deque()).append((job, fn))
+            start_lane = lane not in self._active_lanes
+            if start_lane:
+                self._active_lanes.add(lane)
+            self._prune()
+        if start_lane:
+            self._executor.submit(self._drain, lane)
+        log.info("Ingestion job queued", job_id=job.job_id, session_id=session_id, lane=lane)
+        return job
+
+    def _drain(self, lane: str) -> None:
+        while True:
+            with self._lock:
+                queue = self._queues.get(lane)
+                if not queue:
+                    self._queues.pop(lane, None)
+                    self._active_lanes.discard(lane)
+                    return
+                job, fn = queue.popleft()
+            self._run(job, fn)
+
+    def _run(self, job: IngestionJob, fn: Callable[..., Any]) -> None:
+        def progress(stage: str, **counts: Any) -> None:
+            with self._lock:
+                job.stage = stage
+                job.progress.update(counts)
+
+        with self._lock:
+            job.status = RUNNING
+            job.started = time.time()
+        try:
+            fn(progress)
+            with self._lock:
+                job.status = SUCCEEDED
+            log.info("Ingestion job finished", job_id=job.job_id, session_id=job.session_id,
+                     seconds=round(time.time() - job.started, 3), **job.progress)
+        except Exception as e:
+            with self._lock:
+                job.status = FAILED
+                job.error = str(e)
+            log.error("Ingestion job failed", job_id=job.job_id, session_id=job.session_id, stage=job.stage, error=str(e))
+        finally:
+            with self._lock:
+                job.finished = time.time()
+            job.done.set()
+
+    def _prune(self) -> None:
+        finished = [j for j in self._jobs.values() if j.status in (SUCCEEDED, FAILED)]
+        for job in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job.job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Block until the job finishes (or timeout) and return its state.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.done.wait(timeout)
+        return self.get(job_id)
+
+    def active_sessions(self) -> Set[str]:
+        """
+        Session ids with a queued or running job.
+        """
+        with self._lock:
+            return {j.session_id for j in self._jobs.values() if j.status in (QUEUED, RUNNING) and j.session_id}
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+@lazy_singleton
+def get_ingestion_jobs() -> IngestionJobManager:
+    """
+    Process-wide job manager configured under ingestion_jobs in config.yaml
+    (INGEST_WORKERS overrides max_workers).
+    """
+    cfg = MODEL_REGISTRY.get_config().get("ingestion_jobs") or {}
+    return IngestionJobManager(
+        max_workers = int(os.getenv("INGEST_WORKERS", cfg.get("max_workers", 4))),
+        max_finished_jobs = int(cfg.get("max_finished_jobs", 1000)),
+    )
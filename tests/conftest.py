@@ -0,0 +1,26 @@
+import pytest
+
+from utils.local_embeddings import HashingEmbeddings
+from utils.model_loader import MODEL_REGISTRY
+from utils.vectorstore_cache import get_vectorstore_cache
+
+class LocalModels:
+    """Stands in for ModelLoader offline: local hashing embeddings and a small test config."""
+
+    def __init__(self, max_vectors_per_shard: int = 2, hybrid: bool = True):
+        self.config = {
+            "faiss_db": {"storage": "pickle", "index": {"type": "flat"},
+                         "sharding": {"enabled": True, "max_vectors_per_shard": max_vectors_per_shard}},
+            "retriever": {"hybrid": {"enabled": hybrid, "fetch_k": 10, "rrf_k": 60}},
+        }
+        self.embeddings = HashingEmbeddings(dim=256)
+
+    def load_embeddings(self):
+        return self.embeddings
+
+@pytest.fixture
+def local_models(monkeypatch):
+    """Factory for LocalModels; also keeps the embedding cache and batching wrappers out of the way."""
+    monkeypatch.setitem(MODEL_REGISTRY.get_config()["embedding_model"], "provider", "local")
+    yield LocalModels
+    get_vectorstore_cache().clear()
@@ -0,0 +1,43 @@
+from src.DocIngestion import data_ingestion
+from src.DocIngestion.data_ingestion import ChatIngestor
+from utils.faiss_store import store_exists
+
+def _ingestor(tmp_path, monkeypatch, models):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    monkeypatch.setenv("GOOGLE_API_KEY", "test")
+    ci = ChatIngestor(temp_base=str(tmp_path / "data"), faiss_base=str(tmp_path / "faiss"), session_id="s1")
+    ci.model_loader = models
+    return ci
+
+def test_index_files_only_indexes(tmp_path, monkeypatch, local_models):
+    ci = _ingestor(tmp_path, monkeypatch, local_models(hybrid=False))
+    doc = ci.temp_dir / "warranty.txt"
+    doc.write_text("The warranty covers water damage for two years.\n\nInvoices are due in thirty days.")
+    monkeypatch.setattr(data_ingestion, "make_retriever", None)  #The job must not build a retriever
+
+    added = ci.index_files([doc], chunk_size=60, chunk_overlap=0)
+
+    assert added == 2
+    assert store_exists(ci.faiss_dir)
+
+def test_build_retriever_indexes_then_loads_the_retriever(tmp_path, monkeypatch, local_models):
+    ci = _ingestor(tmp_path, monkeypatch, local_models(hybrid=False))
+    upload = tmp_path / "warranty.txt"
+    upload.write_text("The warranty covers water damage for two years.\n\nInvoices are due in thirty days.")
+
+    with open(upload, "rb") as f:
+        retriever = ci.build_retriever([f], chunk_size=60, chunk_overlap=0, k=1)
+
+    assert "water damage" in retriever.invoke("water damage warranty")[0].page_content
+
+def test_uploading_the_same_file_again_adds_nothing(tmp_path, monkeypatch, local_models):
+    ci = _ingestor(tmp_path, monkeypatch, local_models(hybrid=False))
+    upload = tmp_path / "warranty.txt"
+    upload.write_text("The warranty covers water damage for two years.\n\nInvoices are due in thirty days.")
+
+    counts = []
+    for _ in range(2):
+        with open(upload, "rb") as f:
+            counts.append(ci.index_files(ci.save_files([f]), chunk_size=60, chunk_overlap=0))
+
+    assert counts == [2, 0]
@@ -0,0 +1,21 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.concurrency import lazy_singleton
+
+def test_lazy_singleton_builds_once_under_concurrent_first_calls():
+    calls = []
+
+    @lazy_singleton
+    def get_thing():
+        """The thing."""
+        calls.append(1)
+        time.sleep(0.05)
+        return object()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        things = list(pool.map(lambda _: get_thing(), range(8)))
+
+    assert len(calls) == 1
+    assert all(t is things[0] for t in things)
+    assert get_thing.__doc__ == "The thing."
@@ -0,0 +1,58 @@
+import hashlib
+import json
+
+from langchain_core.documents import Document
+
+from src.DocIngestion.data_ingestion import FaissManager
+
+def _chunk(text, source):
+    return Document(page_content=text, metadata={"source": source})
+
+def test_identical_text_in_different_files_is_kept_per_file(tmp_path, local_models):
+    fm = FaissManager(tmp_path, local_models())
+    added = fm.add_document([_chunk("Standard confidentiality clause.", "a.pdf"),
+                             _chunk("Standard confidentiality clause.", "b.pdf")])
+
+    assert added == 2
+    sources = {d.metadata["source"] for d in fm.vs.similarity_search("confidentiality clause", k=2)}
+    assert sources == {"a.pdf", "b.pdf"}
+
+def test_reingesting_the_same_chunks_adds_nothing(tmp_path, local_models):
+    docs = [_chunk("first chunk", "a.pdf"), _chunk("second chunk", "a.pdf")]
+    assert FaissManager(tmp_path, local_models()).add_document(docs) == 2
+    assert FaissManager(tmp_path, local_models()).add_document(docs) == 0
+
+def test_reuploaded_file_is_deduplicated_by_content_hash(tmp_path, local_models):
+    first = [Document(page_content=t, metadata={"source": "data/s1/1a2b3c4d.pdf", "source_sha256": "f" * 64})
+             for t in ("first chunk", "second chunk")]
+    again = [Document(page_content=t, metadata={"source": "data/s1/9e8d7c6b.pdf", "source_sha256": "f" * 64})
+             for t in ("first chunk", "second chunk")]
+
+    assert FaissManager(tmp_path, local_models()).add_document(first) == 2
+    assert FaissManager(tmp_path, local_models()).add_document(again) == 0
+
+def test_sourceless_chunk_does_not_hide_the_same_text_in_a_file(tmp_path, local_models):
+    assert FaissManager(tmp_path, local_models()).add_document([Document(page_content="shared text")]) == 1
+    assert FaissManager(tmp_path, local_models()).add_document([_chunk("shared text", "a.pdf")]) == 1
+
+def _write_meta(index_dir, rows):
+    (index_dir / "ingested_meta.json").write_text(json.dumps({"rows": {key: True for key in rows}}))
+
+def test_legacy_source_key_covers_every_chunk_of_the_file(tmp_path, local_models):
+    _write_meta(tmp_path, ["old.pdf::"])
+
+    added = FaissManager(tmp_path, local_models()).add_document(
+        [_chunk(f"chunk {i} of old", "old.pdf") for i in range(3)] + [_chunk("chunk of new", "new.pdf")])
+
+    assert added == 1
+
+def test_legacy_row_and_content_keys_are_accepted(tmp_path, local_models):
+    _write_meta(tmp_path, ["rows.csv::0", hashlib.sha256(b"sourceless").hexdigest()])
+
+    added = FaissManager(tmp_path, local_models()).add_document([
+        Document(page_content="row zero", metadata={"source": "rows.csv", "row_id": 0}),
+        Document(page_content="row one", metadata={"source": "rows.csv", "row_id": 1}),
+        Document(page_content="sourceless"),
+    ])
+
+    assert added == 1
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+from utils.file_io import UploadBudget, UploadLimitExceeded, save_uploaded_files, stream_upload_to_file
+
+def _upload(name: str, size: int):
+    f = io.BytesIO(b"x" * size)
+    f.name = name
+    return f
+
+def test_stream_upload_hashes_and_removes_partial_file_over_limit(tmp_path):
+    size, sha = stream_upload_to_file(_upload("a.txt", 10), tmp_path / "a.txt", max_bytes=10)
+    assert size == 10 and len(sha) == 64
+
+    with pytest.raises(UploadLimitExceeded):
+        stream_upload_to_file(_upload("b.txt", 11), tmp_path / "b.txt", max_bytes=10, chunk_size=4)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["a.txt"]
+
+def test_per_file_limit_deletes_every_file_of_the_request(tmp_path):
+    files = [_upload("a.txt", 10), _upload("b.pdf", 10), _upload("c.txt", 11)]
+
+    with pytest.raises(UploadLimitExceeded):
+        save_uploaded_files(files, tmp_path, UploadBudget(max_file_bytes=10, max_request_bytes=100))
+    assert list(tmp_path.iterdir()) == []
+
+def test_per_request_limit_counts_all_files(tmp_path):
+    files = [_upload("a.txt", 8), _upload("b.txt", 8), _upload("c.txt", 8)]
+
+    with pytest.raises(UploadLimitExceeded, match="Request exceeds"):
+        save_uploaded_files(files, tmp_path, UploadBudget(max_file_bytes=10, max_request_bytes=20))
+    assert list(tmp_path.iterdir()) == []
+
+def test_files_within_limits_are_saved_and_unsupported_ones_skipped(tmp_path):
+    files = [_upload("a.txt", 8), _upload("notes.md", 8), _upload("b.pdf", 8)]
+
+    saved = save_uploaded_files(files, tmp_path, UploadBudget(max_file_bytes=10, max_request_bytes=20))
+
+    assert [p.suffix for p in saved] == [".txt", ".pdf"]
+    assert all(p.stat().st_size == 8 for p in saved)
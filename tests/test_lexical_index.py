@@ -0,0 +1,71 @@
+import gc
+import weakref
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from src.DocIngestion.data_ingestion import FaissManager
+from utils.lexical_index import (HybridRetriever, LexicalIndex, make_cached_retriever, make_retriever,
+                                 reciprocal_rank_fusion, tokenize)
+from utils.vectorstore_cache import get_vectorstore_cache
+from utils.local_embeddings import HashingEmbeddings
+
+DOCS = [
+    Document(page_content="Section 7.2.1 limits liability to direct damages.", metadata={"row_id": 0}),
+    Document(page_content="The warranty covers water damage for two years.", metadata={"row_id": 1}),
+    Document(page_content="Invoices are payable within thirty days of receipt.", metadata={"row_id": 2}),
+]
+KEYS = ["a", "b", "c"]
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    assert tokenize("What is in section 7.2.1 of A-1234?") == ["section", "7.2.1", "7", "2", "1", "a-1234", "1234"]
+
+def test_bm25_ranks_matching_chunks_and_persists(tmp_path):
+    index = LexicalIndex(tmp_path)
+    assert index.add(DOCS, KEYS) == 3
+    assert index.add(DOCS[:1], KEYS[:1]) == 0
+    index.close()
+
+    reopened = LexicalIndex(tmp_path)
+    hits = reopened.search("water damages warranty", k=2)
+
+    assert len(reopened) == 3
+    assert hits[0][0].metadata == {"row_id": 1}
+    assert hits[0][1] > hits[1][1]
+    assert reopened.search("7.2.1")[0][0].metadata == {"row_id": 0}
+    assert reopened.search("the of") == []
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    a, b, c = DOCS
+    fused = reciprocal_rank_fusion([[a, b, c], [b, c]], k=3, rrf_k=60)
+
+    assert fused == [b, c, a]
+    assert reciprocal_rank_fusion([[a, b], [a]], k=1) == [a]
+
+def test_make_retriever_is_hybrid_only_with_a_lexical_index(tmp_path):
+    vs = FAISS.from_documents(DOCS, HashingEmbeddings(dim=256))
+    config = {"retriever": {"hybrid": {"enabled": True, "fetch_k": 3}}}
+
+    assert not isinstance(make_retriever(vs, tmp_path, k=1, config=config), HybridRetriever)
+
+    LexicalIndex(tmp_path).add(DOCS, KEYS)
+    retriever = make_retriever(vs, tmp_path, k=1, config=config)
+
+    assert isinstance(retriever, HybridRetriever)
+    assert retriever.invoke("liability under 7.2.1")[0].metadata == {"row_id": 0}
+    disabled = {"retriever": {"hybrid": {"enabled": False}}}
+    assert not isinstance(make_retriever(vs, tmp_path, k=1, config=disabled), HybridRetriever)
+
+def test_cached_retriever_takes_the_store_from_the_cache_per_query(tmp_path, local_models):
+    models = local_models(hybrid=True)
+    FaissManager(tmp_path, models).add_document(DOCS[:2])
+    retriever = make_cached_retriever(tmp_path, models.embeddings, k=1, config=models.config)
+    assert retriever.invoke("warranty water damage")[0].metadata == {"row_id": 1}
+
+    store = weakref.ref(get_vectorstore_cache().get(tmp_path, models.embeddings))
+    get_vectorstore_cache().clear()
+    gc.collect()
+    assert store() is None
+
+    FaissManager(tmp_path, models).add_document(DOCS[2:])
+    assert retriever.invoke("invoices payable thirty days")[0].metadata == {"row_id": 2}
@@ -0,0 +1,28 @@
+import time
+
+from langchain_core.load import dumps
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration
+
+from utils.llm_cache import SQLiteLLMCache
+
+def _cache(tmp_path):
+    return SQLiteLLMCache(str(tmp_path / "llm.sqlite"), "groq", "model", 0.0)
+
+def test_round_trips_chat_generations(tmp_path):
+    cache = _cache(tmp_path)
+    cache.update("prompt", "llm", [ChatGeneration(message=AIMessage(content="answer"))])
+
+    hit = cache.lookup("prompt", "llm")
+    assert [g.message.content for g in hit] == ["answer"]
+    assert cache.lookup("other prompt", "llm") is None
+
+def test_rejects_entries_outside_the_allow_list(tmp_path):
+    cache = _cache(tmp_path)
+    key = cache._key("prompt", "llm")
+    now = time.time()
+    cache._conn.execute("INSERT INTO llm_cache VALUES (?, ?, ?, ?, ?)",
+                        (key, cache.namespace, now, now, dumps([ToolMessage(content="x", tool_call_id="1")])))
+    cache._conn.commit()
+
+    assert cache.lookup("prompt", "llm") is None
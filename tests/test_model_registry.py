@@ -0,0 +1,27 @@
+from utils import model_loader
+from utils.model_loader import ModelRegistry
+
+def test_reload_rereads_dotenv_with_override(monkeypatch):
+    calls = []
+    monkeypatch.setattr(model_loader, "load_dotenv", lambda override=False: calls.append(override))
+    monkeypatch.setattr(model_loader, "load_config", lambda: {"llm": {}})
+    registry = ModelRegistry()
+
+    registry.get_config()
+    registry.get_config()
+    registry.reload()
+    registry.get_config()
+
+    #Startup keeps real environment variables; reload lets changed .env values win
+    assert calls == [False, True]
+
+def test_required_env_vars_include_the_rewrite_llm(monkeypatch):
+    monkeypatch.setenv("LLM_PROVIDER", "google")
+    loader = object.__new__(model_loader.ModelLoader)
+    loader.config = {
+        "embedding_model": {"provider": "local"},
+        "llm": {"google": {"provider": "google"}, "groq_rewrite": {"provider": "groq"}},
+        "chat": {"rewrite_llm": "groq_rewrite"},
+    }
+
+    assert loader._required_env_vars() == ["GOOGLE_API_KEY", "GROQ_API_KEY"]
@@ -0,0 +1,61 @@
+from utils.page_diff import align_pages, IDENTICAL, CHANGED, ADDED, REMOVED
+
+CONTRACT = (
+    "The supplier shall deliver the goods within thirty days of the purchase order. "
+    "Payment is due within sixty days of the invoice date. Late payments accrue interest "
+    "at two percent per month. Either party may terminate this agreement with ninety days notice."
+)
+UNRELATED = (
+    "Our quarterly newsletter covers the company picnic, new hires in the marketing team, "
+    "and a reminder to submit expense reports before the end of the month. The cafeteria "
+    "will be closed on Friday for renovations to the kitchen area."
+)
+
+def _statuses(diffs):
+    return [(d.status, d.ref_page, d.act_page) for d in diffs]
+
+def test_identical_pages_are_matched_without_diff():
+    diffs = align_pages(["a", "b"], ["a", "b"])
+    assert _statuses(diffs) == [(IDENTICAL, 1, 1), (IDENTICAL, 2, 2)]
+    assert all(d.diff == "" for d in diffs)
+
+def test_whitespace_only_changes_are_identical():
+    assert _statuses(align_pages(["one  two\nthree"], ["one two three"])) == [(IDENTICAL, 1, 1)]
+
+def test_inserted_unrelated_page_does_not_steal_the_match():
+    ref = ["intro", CONTRACT, "closing"]
+    act = ["intro", UNRELATED, CONTRACT + " Amended.", "closing"]
+    assert _statuses(align_pages(ref, act)) == [
+        (IDENTICAL, 1, 1),
+        (ADDED, None, 2),
+        (CHANGED, 2, 3),
+        (IDENTICAL, 3, 4),
+    ]
+
+def test_unrelated_replacement_is_removed_and_added():
+    statuses = _statuses(align_pages(["intro", CONTRACT], ["intro", UNRELATED]))
+    assert statuses == [(IDENTICAL, 1, 1), (REMOVED, 2, None), (ADDED, None, 2)]
+
+def test_changed_page_carries_only_the_differing_lines():
+    ref = ["line one\nline two\nline three"]
+    act = ["line one\nline 2\nline three"]
+    (diff,) = align_pages(ref, act, context=0)
+    assert diff.status == CHANGED
+    assert "-line two" in diff.diff and "+line 2" in diff.diff
+    assert "line one" not in diff.diff
+
+def test_footer_change_on_every_page_pairs_pages_in_place():
+    ref = [f"{CONTRACT} Clause {i}.\nVersion 1" for i in range(30)]
+    act = [f"{CONTRACT} Clause {i}.\nVersion 2" for i in range(30)]
+    statuses = _statuses(align_pages(ref, act))
+    assert statuses == [(CHANGED, i, i) for i in range(1, 31)]
+
+def test_blocks_over_the_comparison_cap_are_paired_positionally():
+    ref = ["intro", CONTRACT, "closing"]
+    act = ["intro", UNRELATED, CONTRACT + " Amended.", "closing"]
+    assert _statuses(align_pages(ref, act, max_comparisons=1)) == [
+        (IDENTICAL, 1, 1),
+        (CHANGED, 2, 2),
+        (ADDED, None, 3),
+        (IDENTICAL, 3, 4),
+    ]
@@ -0,0 +1,47 @@
+import os
+import time
+
+import fitz
+
+from utils.pdf_extractor import PDFTextExtractor
+
+def _pdf(path, *pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+    doc.close()
+    return path
+
+def test_pages_are_extracted_and_served_from_cache(tmp_path):
+    pdf = _pdf(tmp_path / "a.pdf", "first page", "second page")
+    extractor = PDFTextExtractor(cache_dir=str(tmp_path / "cache"))
+
+    assert [p.strip() for p in extractor.extract_pages(pdf)] == ["first page", "second page"]
+    assert [p.strip() for p in extractor.extract_pages(pdf)] == ["first page", "second page"]
+    assert (extractor.hits, extractor.misses) == (1, 1)
+
+def test_expired_cache_entries_are_deleted(tmp_path):
+    cache = tmp_path / "cache"
+    extractor = PDFTextExtractor(cache_dir=str(cache), ttl_seconds=60, max_cache_mb=None)
+    extractor.extract_pages(_pdf(tmp_path / "old.pdf", "old"))
+    (old,) = cache.glob("*.json")
+    os.utime(old, (time.time() - 120, time.time() - 120))
+
+    extractor.extract_pages(_pdf(tmp_path / "new.pdf", "new"))
+
+    assert not old.exists()
+    assert len(list(cache.glob("*.json"))) == 1
+
+def test_least_recently_used_entries_are_deleted_over_the_size_limit(tmp_path):
+    cache = tmp_path / "cache"
+    extractor = PDFTextExtractor(cache_dir=str(cache), ttl_seconds=None, max_cache_mb=0)
+    a = _pdf(tmp_path / "a.pdf", "a")
+    extractor.extract_pages(a)
+    extractor.extract_pages(_pdf(tmp_path / "b.pdf", "b"))
+
+    #Only the newest entry is kept when even it exceeds the budget
+    assert len(list(cache.glob("*.json"))) == 1
+    assert extractor.evictions == 1
+    extractor.extract_pages(a)
+    assert extractor.misses == 3
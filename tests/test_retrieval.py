@@ -0,0 +1,24 @@
+import pytest
+
+from src.DocChat.retrieval import ConversationRAG
+
+def _rag():
+    rag = object.__new__(ConversationRAG)
+    rag.rewrite_heuristic = True
+    rag.rewrite_max_words = 4
+    return rag
+
+@pytest.mark.parametrize("question, expected", [
+    ("Does it cover water damage after the first year?", True),
+    ("What about the termination notice period in Germany?", True),
+    ("And how long is the notice period for contractors?", True),
+    ("That clause applies to which suppliers exactly?", True),
+    ("What does the contract say about one year warranties?", False),
+    ("Is there more than this single payment schedule listed?", False),
+    ("Which documents mention the same supplier as the invoice?", False),
+])
+def test_only_follow_ups_are_rewritten(question, expected):
+    assert _rag().needs_rewrite({"input": question, "chat_history": ["previous turn"]}) is expected
+
+def test_without_history_nothing_is_rewritten():
+    assert _rag().needs_rewrite({"input": "what about it?", "chat_history": []}) is False
@@ -0,0 +1,103 @@
+import os
+import time
+
+import pytest
+
+from utils.session_janitor import SessionJanitor
+
+DAY = 86400
+MB = 1024 * 1024
+
+def _session(base, session_id, size, age):
+    d = base / session_id
+    d.mkdir(parents=True, exist_ok=True)
+    f = d / "payload.bin"
+    f.write_bytes(b"x" * size)
+    t = time.time() - age
+    os.utime(f, (t, t))
+    os.utime(d, (t, t))
+    return d
+
+@pytest.fixture
+def stores(tmp_path):
+    data, faiss = tmp_path / "data", tmp_path / "faiss_index"
+    analysis = data / "document_analysis"
+    for d in (data, faiss, analysis):
+        d.mkdir(parents=True)
+    return data, analysis, faiss
+
+def _janitor(stores, **kwargs):
+    kwargs.setdefault("ttl_seconds", 7 * DAY)
+    kwargs.setdefault("min_idle_seconds", 60)
+    return SessionJanitor(stores, **kwargs)
+
+def test_ttl_deletes_expired_session_across_stores(stores):
+    data, analysis, faiss = stores
+    _session(data, "old", 10, 8 * DAY)
+    _session(faiss, "old", 10, 8 * DAY)
+    _session(data, "recent", 10, DAY)
+
+    result = _janitor(stores).sweep()
+
+    assert result["expired"] == ["old"]
+    assert not (data / "old").exists() and not (faiss / "old").exists()
+    assert (data / "recent").exists()
+    assert analysis.exists()
+
+def test_quota_evicts_least_recently_used_first(stores):
+    data, analysis, faiss = stores
+    _session(data, "oldest", MB, 3000)
+    _session(analysis, "middle", MB, 2000)
+    _session(faiss, "newest", MB, 1000)
+
+    result = _janitor(stores, max_total_mb=2).sweep()
+
+    assert result["evicted"] == ["oldest"]
+    assert result["total_bytes"] == 2 * MB
+    assert (analysis / "middle").exists() and (faiss / "newest").exists()
+
+def test_recently_used_sessions_are_never_deleted(stores):
+    data, _, _ = stores
+    _session(data, "fresh", MB, 10)
+
+    result = _janitor(stores, ttl_seconds=0, max_total_mb=0.5).sweep()
+
+    assert result["expired"] == [] and result["evicted"] == []
+    assert (data / "fresh").exists()
+
+def test_leased_and_in_use_sessions_are_protected(stores):
+    data, _, faiss = stores
+    _session(data, "leased", 10, 8 * DAY)
+    _session(faiss, "indexing", 10, 8 * DAY)
+    _session(data, "idle", 10, 8 * DAY)
+    janitor = _janitor(stores)
+    janitor.add_in_use_source(lambda: {"indexing"})
+
+    with janitor.lease("leased"):
+        result = janitor.sweep()
+
+    assert result["expired"] == ["idle"]
+    assert (data / "leased").exists() and (faiss / "indexing").exists()
+    #The lease also counts as use, so the session stays protected for min_idle_seconds
+    assert janitor.sweep()["expired"] == []
+
+def test_reserved_dirs_and_files_are_not_sessions(stores):
+    data, _, faiss = stores
+    _session(faiss, "_shards", 10, 8 * DAY)
+    (faiss / "index.faiss").write_bytes(b"x")
+
+    result = _janitor(stores, ttl_seconds=0).sweep()
+
+    assert result["sessions"] == 0
+    assert (faiss / "_shards").exists() and (faiss / "index.faiss").exists()
+
+def test_evict_listeners_receive_deleted_sessions(stores):
+    data, _, _ = stores
+    _session(data, "old", 10, 8 * DAY)
+    janitor = _janitor(stores)
+    evicted = []
+    janitor.add_evict_listener(evicted.append)
+
+    janitor.sweep()
+
+    assert evicted == ["old"]
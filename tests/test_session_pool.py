@@ -0,0 +1,12 @@
+import time
+
+from src.DocChat.session_pool import ConversationSessionPool, _PooledSession
+
+def test_idle_sessions_are_not_reported_in_use():
+    pool = ConversationSessionPool(idle_timeout_seconds=60)
+    pool._sessions[("active", "/idx/active", 5)] = _PooledSession(rag=None)
+    pool._sessions[("idle", "/idx/idle", 5)] = _PooledSession(rag=None,
+                                                             last_used=time.monotonic() - 120)
+
+    assert pool.session_ids() == {"active"}
+    assert pool.stats() == {"sessions": 1}
@@ -0,0 +1,70 @@
+import json
+
+from langchain_core.documents import Document
+
+from utils.lexical_index import LexicalIndex
+from utils.sharded_index import MANIFEST_FILE, is_sharded, make_sharded_retriever, shard_dirs, shards_root
+from src.DocIngestion.data_ingestion import FaissManager, ShardedFaissManager
+
+TOPICS = ["invoice payment terms", "warranty repair coverage", "shipping delivery schedule",
+          "termination notice period", "confidential information handling"]
+
+def _docs(source: str):
+    return [Document(page_content=f"{topic} clause for {source}", metadata={"source": source, "row_id": i})
+            for i, topic in enumerate(TOPICS)]
+
+def _manifest(index_dir):
+    return json.loads((shards_root(index_dir) / MANIFEST_FILE).read_text())
+
+def _store_mtimes(shard):
+    #SQLite files are left out: closing a reader may checkpoint the WAL into them
+    return {p.name: p.stat().st_mtime_ns for p in shard.iterdir() if not p.name.startswith("lexical.sqlite")}
+
+def test_chunks_roll_over_into_fixed_size_shards(tmp_path, local_models):
+    models = local_models(max_vectors_per_shard=2)
+    added = ShardedFaissManager(tmp_path, models).add_document(_docs("a.pdf"))
+
+    assert added == 5
+    assert is_sharded(tmp_path)
+    assert _manifest(tmp_path)["shards"] == {"shard_00000": 2, "shard_00001": 2, "shard_00002": 1}
+    assert len(shard_dirs(tmp_path)) == 3
+
+def test_new_data_only_touches_the_active_shard(tmp_path, local_models):
+    models = local_models(max_vectors_per_shard=2)
+    ShardedFaissManager(tmp_path, models).add_document(_docs("a.pdf"))
+    full = _store_mtimes(shards_root(tmp_path) / "shard_00000")
+
+    ShardedFaissManager(tmp_path, models).add_document(_docs("b.pdf")[:1])
+
+    assert _store_mtimes(shards_root(tmp_path) / "shard_00000") == full
+    assert len(LexicalIndex(shards_root(tmp_path) / "shard_00000")) == 2
+    assert _manifest(tmp_path) == {"shards": {"shard_00000": 2, "shard_00001": 2, "shard_00002": 2}}
+
+def test_reingesting_is_deduplicated_across_shards(tmp_path, local_models):
+    models = local_models(max_vectors_per_shard=2)
+    ShardedFaissManager(tmp_path, models).add_document(_docs("a.pdf"))
+
+    assert ShardedFaissManager(tmp_path, models).add_document(_docs("a.pdf")) == 0
+    assert sum(_manifest(tmp_path)["shards"].values()) == 5
+
+def test_search_fans_out_and_applies_filters_per_shard(tmp_path, local_models):
+    models = local_models(max_vectors_per_shard=2)
+    manager = ShardedFaissManager(tmp_path, models)
+    manager.add_document(_docs("a.pdf"))
+    manager.add_document(_docs("b.pdf"))
+    retriever = make_sharded_retriever(tmp_path, models.embeddings, k=2, config=models.config)
+
+    top = retriever.invoke("warranty repair coverage")
+    assert all("warranty" in d.page_content for d in top)
+    assert {d.metadata["source"] for d in top} == {"a.pdf", "b.pdf"}
+
+    retriever.filter = {"source": "b.pdf"}
+    filtered = retriever.invoke("termination notice period")
+    assert filtered and all(d.metadata["source"] == "b.pdf" for d in filtered)
+    assert "termination" in filtered[0].page_content
+
+def test_index_saved_before_sharding_counts_for_dedup(tmp_path, local_models):
+    models = local_models(max_vectors_per_shard=2)
+    FaissManager(tmp_path, models).add_document(_docs("a.pdf"))
+
+    assert ShardedFaissManager(tmp_path, models).add_document(_docs("a.pdf") + _docs("b.pdf")[:1]) == 1
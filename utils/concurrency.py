@@ -0,0 +1,97 @@
+import os
+import asyncio
+import functools
+import threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, TypeVar
+
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+T = TypeVar("T")
+
+#Bounded executors that keep blocking work off the event loop.
+#IO: disk reads/writes, index loading, blocking network clients. CPU: PDF parsing and text processing.
+IO_WORKERS = int(os.getenv("IO_WORKERS", "16"))
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="docportal-io")
+CPU_EXECUTOR = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="docportal-cpu")
+
+#Worker processes for parsing. They are spawned, not forked: this process runs logging, janitor
+#and pool threads, and forking it while one of them holds a lock can deadlock the child.
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", str(os.cpu_count() or 2)))
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+def lazy_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Decorator for process-wide instances: the first call runs factory (once, even when several
+    threads race for it) and every later call returns the same object.
+    """
+    lock = threading.Lock()
+    instance: List[T] = []
+
+    @functools.wraps(factory)
+    def get() -> T:
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+    return get
+
+async def run_io(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking I/O-bound callable on the bounded IO executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(IO_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+async def run_cpu(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a CPU-bound callable (e.g. PDF parsing) on the bounded CPU executor.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(CPU_EXECUTOR, functools.partial(fn, *args, **kwargs))
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    The long-lived process pool, started on first use (and again if a worker died).
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or getattr(_process_pool, "_broken", False):
+            _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, mp_context=mp.get_context("spawn"))
+        return _process_pool
+
+def process_map(fn: Callable[[Any], Any], items: Iterable[Any], max_parallel: Optional[int] = None) -> Iterator[Any]:
+    """
+    Yield fn(item) for each item, in input order, computed on the shared process pool with at
+    most max_parallel items in flight (fn must be a picklable module-level function).
+    """
+    pool = get_process_pool()
+    limit = max(1, max_parallel or PROCESS_WORKERS)
+    items = iter(items)
+    pending: Deque = deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= limit:
+            break
+    while pending:
+        result = pending.popleft().result()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            break
+        yield result
+
+def shutdown_executors() -> None:
+    IO_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    CPU_EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+    log.info("Executors shut down")
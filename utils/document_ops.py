@@ -5,9 +5,10 @@ import json
 import uuid
 import hashlib
 import shutil
+import time
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Iterable, List, Optional, Dict, Any
+from typing import Callable, Iterable, List, Optional, Dict, Any, Tuple
 from fastapi import UploadFile
 
 import fitz  # PyMuPDF
@@ -17,36 +18,114 @@ from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, Te
 from langchain_community.vectorstores import FAISS
 
 from utils.model_loader import ModelLoader
+from utils.metrics import span, count_items
+from utils.concurrency import process_map
+from utils.pdf_extractor import file_sha256, get_pdf_extractor
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 
 log = CustomLogger().get_logger(__name__)
 
-SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
 SUPPORTED_EXTENSIONS = {".pdf", ".docx", ".txt"}
 
-def load_documents(paths: Iterable[Path]) -> List[Document]:
-    """Load docs using appropriate loader based on extension."""
-    docs: List[Document] = []
+def _load_one(path: str) -> Tuple[List[Document], float, Optional[str]]:
+    """
+    Parse a single file; runs in a worker process. Returns (docs, seconds, error).
+    Each doc carries the file's content hash as source_sha256, which stays the same when
+    the same file is uploaded again under a new name.
+    """
+    start = time.perf_counter()
     try:
+        ext = Path(path).suffix.lower()
+        if ext == ".pdf":
+            loader = PyPDFLoader(path)
+        elif ext == ".docx":
+            loader = Docx2txtLoader(path)
+        else:
+            loader = TextLoader(path, encoding="utf-8")
+        docs = loader.load()
+        sha = file_sha256(path)
+        for d in docs:
+            d.metadata["source_sha256"] = sha
+        return docs, time.perf_counter() - start, None
+    except Exception as e:
+        return [], time.perf_counter() - start, f"{type(e).__name__}: {e}"
+
+def _resolve_workers(max_workers: Optional[int], n_files: int) -> int:
+    if max_workers is None:
+        max_workers = int(os.getenv("DOC_LOAD_WORKERS", "0")) or (os.cpu_count() or 1)
+    return max(1, min(max_workers, n_files))
+
+@span("load_documents")
+def load_documents(paths: Iterable[Path], max_workers: Optional[int] = None,
+                   on_file_parsed: Optional[Callable[[int, int], None]] = None) -> List[Document]:
+    """
+    Load docs using appropriate loader based on extension.
+    Files are parsed on the shared process pool (at most max_workers at a time, default
+    DOC_LOAD_WORKERS or CPU count);
+    results keep the input order and a file that fails to parse is logged and skipped.
+    on_file_parsed(done, total) is called as each file's result is collected.
+    """
+    try:
+        files: List[str] = []
         for p in paths:
-            ext = p.suffix.lower()
-            if ext == ".pdf":
-                loader = PyPDFLoader(str(p))
-            elif ext == ".docx":
-                loader = Docx2txtLoader(str(p))
-            elif ext == ".txt":
-                loader = TextLoader(str(p), encoding="utf-8")
-            else:
+            p = Path(p)
+            if p.suffix.lower() not in SUPPORTED_EXTENSIONS:
                 log.warning("Unsupported extension skipped", path=str(p))
                 continue
-            docs.extend(loader.load())
-        log.info("Documents loaded", count=len(docs))
+            files.append(str(p))
+        if not files:
+            log.info("Documents loaded", count=0)
+            return []
+
+        def collect(results_iter) -> list:
+            collected = []
+            for result in results_iter:
+                collected.append(result)
+                if on_file_parsed is not None:
+                    on_file_parsed(len(collected), len(files))
+            return collected
+
+        workers = _resolve_workers(max_workers, len(files))
+        if workers == 1:
+            results = collect(_load_one(f) for f in files)
+        else:
+            results = collect(process_map(_load_one, files, max_parallel=workers))
+
+        docs: List[Document] = []
+        failed = 0
+        for path, (file_docs, elapsed, error) in zip(files, results):
+            if error is not None:
+                failed += 1
+                log.error("Failed to load document", path=path, error=error, seconds=round(elapsed, 3))
+                continue
+            log.info("Document parsed", path=path, pages=len(file_docs), seconds=round(elapsed, 3))
+            docs.extend(file_docs)
+        log.info("Documents loaded", count=len(docs), files=len(files), failed=failed, workers=workers)
+        count_items("load_documents", len(files))
         return docs
     except Exception as e:
         log.error("Failed loading documents", error=str(e))
         raise DocumentPortalException("Error loading documents", e) from e
 
+def read_pdf_pages(pdf_path, session_id: Optional[str] = None) -> List[str]:
+    """
+    Per-page text of a PDF (empty string for pages without text), via the shared extractor.
+    """
+    try:
+        pages = get_pdf_extractor().extract_pages(pdf_path)
+        log.info("PDF pages read successfully", pdf_path = str(pdf_path), session_id = session_id, pages = len(pages))
+        return pages
+    except Exception as e:
+        log.error("Failed to read PDF pages", error = str(e), pdf_path = str(pdf_path), session_id = session_id)
+        raise DocumentPortalException(f"Error reading PDF: {pdf_path}", e)
+
+def join_pages(pages: List[str]) -> str:
+    """
+    Single-pass analysis text: every page under a "--- Page n ---" header.
+    """
+    return "\n".join(f"\n--- Page {i + 1} ---\n{page}" for i, page in enumerate(pages))
+
 def concat_for_analysis(docs: List[Document]) -> str:
     parts = []
     for d in docs:
@@ -61,10 +140,14 @@ def concat_for_comparison(ref_docs: List[Document], act_docs: List[Document]) ->
 
 # ---------- Helpers ----------
 class FastAPIFileAdapter:
-    """Adapt FastAPI UploadFile -> .name + .getbuffer() API"""
+    """Adapt FastAPI UploadFile -> .name + streaming .read()/.seek() (and legacy .getbuffer()) API"""
     def __init__(self, uf: UploadFile):
         self._uf = uf
         self.name = uf.filename
+    def read(self, size: int = -1) -> bytes:
+        return self._uf.file.read(size)
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._uf.file.seek(offset, whence)
     def getbuffer(self) -> bytes:
         self._uf.file.seek(0)
         return self._uf.file.read()
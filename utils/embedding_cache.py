@@ -0,0 +1,136 @@
+from __future__ import annotations
+import os
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils.model_loader import MODEL_REGISTRY
+from utils.metrics import record_cache
+from utils.concurrency import lazy_singleton
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+_SQLITE_MAX_VARS = 500
+
+def _text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingStore:
+    """
+    Content-addressed on-disk store of embeddings keyed by (model name, sha256 of text).
+    Vectors are stored as float32 blobs in SQLite.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL, hash TEXT NOT NULL, dim INTEGER NOT NULL, vec BLOB NOT NULL,"
+            " PRIMARY KEY (model, hash)) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(hashes))
+        with self._lock:
+            for i in range(0, len(unique), _SQLITE_MAX_VARS):
+                batch = unique[i:i + _SQLITE_MAX_VARS]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vec FROM embeddings WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, model: str, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        rows = []
+        for h, vec in items.items():
+            arr = np.asarray(vec, dtype=np.float32)
+            rows.append((model, h, int(arr.shape[0]), arr.tobytes()))
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, hash, dim, vec) VALUES (?, ?, ?, ?)", rows)
+            self._conn.commit()
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingStore and only
+    sends cache misses to the underlying embedding model.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, store: EmbeddingStore):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        hashes = [_text_hash(t) for t in texts]
+        cached = self.store.get_many(self.model_name, hashes)
+
+        # Embed each distinct missing text once
+        missing: Dict[str, str] = {}
+        for h, t in zip(hashes, texts):
+            if h not in cached and h not in missing:
+                missing[h] = t
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self.store.put_many(self.model_name, fresh)
+            cached.update(fresh)
+
+        hit_count = len(texts) - len(missing)
+        with self._lock:
+            self.hits += hit_count
+            self.misses += len(missing)
+        record_cache("embedding", hits=hit_count, misses=len(missing))
+        log.info("Embedding cache lookup", model=self.model_name, total=len(texts),
+                 hits=hit_count, misses=len(missing))
+        return [cached[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+@lazy_singleton
+def _embedding_store() -> EmbeddingStore:
+    cache_cfg = (MODEL_REGISTRY.get_config().get("embedding_model") or {}).get("cache") or {}
+    path = os.getenv("EMBEDDING_CACHE_PATH", cache_cfg.get("path", "cache/embeddings.sqlite"))
+    log.info("Embedding cache opened", path=path)
+    return EmbeddingStore(path)
+
+def with_embedding_cache(embeddings: Embeddings) -> Embeddings:
+    """
+    Wrap embeddings with the on-disk cache configured under embedding_model.cache in config.yaml.
+    Returns the embeddings unchanged when the cache is disabled or the provider is local
+    (computing a local embedding is cheaper than looking it up).
+    """
+    emb_cfg = MODEL_REGISTRY.get_config().get("embedding_model") or {}
+    cache_cfg = emb_cfg.get("cache") or {}
+    if not cache_cfg.get("enabled", False) or emb_cfg.get("provider") == "local":
+        return embeddings
+    model_name = f"{emb_cfg.get('provider', 'unknown')}:{emb_cfg.get('model_name', 'unknown')}"
+    return CachedEmbeddings(embeddings, model_name, _embedding_store())
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from utils.model_loader import MODEL_REGISTRY
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+_THROTTLE_NAMES = {"ResourceExhausted", "TooManyRequests", "RateLimitError"}
+_THROTTLE_MARKERS = ("429", "rate limit", "ratelimit", "quota", "resource exhausted", "resource_exhausted", "too many requests")
+
+def is_throttling_error(e: BaseException) -> bool:
+    """
+    Best-effort detection of provider throttling across Google/Groq/OpenAI client errors.
+    """
+    if type(e).__name__ in _THROTTLE_NAMES:
+        return True
+    for attr in ("status_code", "code", "http_status"):
+        if getattr(e, attr, None) == 429:
+            return True
+    msg = str(e).lower()
+    return any(marker in msg for marker in _THROTTLE_MARKERS)
+
+class BatchEmbedder(Embeddings):
+    """
+    Embeddings wrapper that splits documents into fixed-size batches, embeds a bounded
+    number of batches concurrently and retries throttled batches with exponential backoff.
+    """
+
+    def __init__(self, underlying: Embeddings,
+                 batch_size: int = 100,
+                 max_concurrency: int = 4,
+                 max_retries: int = 5,
+                 backoff_seconds: float = 1.0,
+                 max_backoff_seconds: float = 30.0):
+        self.underlying = underlying
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+    def _embed_batch(self, batch_no: int, batch: List[str]) -> List[List[float]]:
+        attempt = 0
+        while True:
+            try:
+                return self.underlying.embed_documents(batch)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** attempt))
+                delay += random.uniform(0, delay / 2)
+                attempt += 1
+                log.warning("Embedding batch throttled, retrying", batch=batch_no, attempt=attempt,
+                            delay_seconds=round(delay, 2), error=str(e)[:200])
+                time.sleep(delay)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        start = time.perf_counter()
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        workers = min(self.max_concurrency, len(batches))
+        if workers == 1:
+            results = [self._embed_batch(i, b) for i, b in enumerate(batches)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+                results = list(pool.map(self._embed_batch, range(len(batches)), batches))
+
+        vectors = [v for batch_vectors in results for v in batch_vectors]
+        elapsed = time.perf_counter() - start
+        log.info("Chunks embedded", chunks=len(texts), batches=len(batches), concurrency=workers,
+                 seconds=round(elapsed, 3), chunks_per_second=round(len(texts) / elapsed, 1) if elapsed > 0 else None)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.underlying.embed_query(text)
+
+def with_batching(embeddings: Embeddings) -> Embeddings:
+    """
+    Wrap embeddings with a BatchEmbedder configured under embedding_model.batch in config.yaml.
+    Local embeddings are already vectorized in-process and are returned unchanged.
+    """
+    emb_cfg = MODEL_REGISTRY.get_config().get("embedding_model") or {}
+    if emb_cfg.get("provider") == "local":
+        return embeddings
+    cfg = emb_cfg.get("batch") or {}
+    return BatchEmbedder(
+        embeddings,
+        batch_size = int(cfg.get("size", 100)),
+        max_concurrency = int(cfg.get("max_concurrency", 4)),
+        max_retries = int(cfg.get("max_retries", 5)),
+        backoff_seconds = float(cfg.get("backoff_seconds", 1.0)),
+        max_backoff_seconds = float(cfg.get("max_backoff_seconds", 30.0)),
+    )
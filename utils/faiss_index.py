@@ -0,0 +1,110 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+
+from utils.model_loader import MODEL_REGISTRY
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+INDEX_TYPES = {"flat", "hnsw", "ivf", "pq", "ivfpq"}
+
+def index_config(config: Optional[dict] = None) -> Dict[str, Any]:
+    """
+    Return the faiss_db.index section of config.yaml (defaults to a flat index).
+    """
+    config = config if config is not None else MODEL_REGISTRY.get_config()
+    cfg = dict((config.get("faiss_db") or {}).get("index") or {})
+    cfg.setdefault("type", "flat")
+    if cfg["type"] not in INDEX_TYPES:
+        raise ValueError(f"Unsupported faiss_db.index.type '{cfg['type']}', expected one of {sorted(INDEX_TYPES)}")
+    return cfg
+
+def min_training_vectors(cfg: Dict[str, Any]) -> int:
+    """
+    Number of vectors needed before a trained index (IVF / PQ) can be built.
+    """
+    factor = int(cfg.get("min_train_factor", 39))
+    kind = cfg["type"]
+    nlist = int((cfg.get("ivf") or {}).get("nlist", 256))
+    nbits = int((cfg.get("pq") or {}).get("nbits", 8))
+    if kind == "ivf":
+        return nlist * factor
+    if kind == "pq":
+        return (2 ** nbits) * factor
+    if kind == "ivfpq":
+        return max(nlist, 2 ** nbits) * factor
+    return 0
+
+def build_index(dim: int, cfg: Dict[str, Any], vectors: Optional[np.ndarray] = None) -> faiss.Index:
+    """
+    Build (and train, if required) an empty index of the configured type.
+    """
+    kind = cfg["type"]
+    hnsw = cfg.get("hnsw") or {}
+    ivf = cfg.get("ivf") or {}
+    pq = cfg.get("pq") or {}
+
+    if kind == "flat":
+        return faiss.IndexFlatL2(dim)
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, int(hnsw.get("m", 32)))
+        index.hnsw.efConstruction = int(hnsw.get("ef_construction", 200))
+        index.hnsw.efSearch = int(hnsw.get("ef_search", 64))
+        return index
+
+    pq_m = int(pq.get("m", 16))
+    nbits = int(pq.get("nbits", 8))
+    if kind in ("pq", "ivfpq") and dim % pq_m != 0:
+        raise ValueError(f"Embedding dimension {dim} is not divisible by pq.m={pq_m}")
+
+    if kind == "ivf":
+        index = faiss.IndexIVFFlat(faiss.IndexFlatL2(dim), dim, int(ivf.get("nlist", 256)))
+    elif kind == "pq":
+        index = faiss.IndexPQ(dim, pq_m, nbits)
+    else:
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, int(ivf.get("nlist", 256)), pq_m, nbits)
+
+    if vectors is None:
+        raise ValueError(f"Index type '{kind}' needs training vectors")
+    index.train(np.ascontiguousarray(vectors, dtype=np.float32))
+    apply_search_params(index, cfg)
+    return index
+
+def apply_search_params(index: faiss.Index, cfg: Dict[str, Any]) -> faiss.Index:
+    """
+    Apply query-time parameters (HNSW efSearch, IVF nprobe) from config to a loaded index.
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = int((cfg.get("hnsw") or {}).get("ef_search", index.hnsw.efSearch))
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = int((cfg.get("ivf") or {}).get("nprobe", index.nprobe))
+    return index
+
+def _is_flat(index: faiss.Index) -> bool:
+    return isinstance(faiss.downcast_index(index), faiss.IndexFlat)
+
+def upgrade_index(index: faiss.Index, cfg: Dict[str, Any]) -> faiss.Index:
+    """
+    Rebuild a flat index as the configured index type once it holds enough vectors to train.
+    Vectors keep their positions, so the docstore mapping stays valid.
+    Returns the original index when no rebuild is needed (or possible yet).
+    """
+    kind = cfg["type"]
+    if kind == "flat" or not _is_flat(index):
+        return index
+    needed = min_training_vectors(cfg)
+    if index.ntotal == 0 or index.ntotal < needed:
+        log.info("FAISS index kept flat until enough vectors exist to train", index_type=kind,
+                 vectors=index.ntotal, required=needed)
+        return index
+
+    vectors = index.reconstruct_n(0, index.ntotal)
+    new_index = build_index(index.d, cfg, vectors)
+    new_index.add(vectors)
+    log.info("FAISS index rebuilt", index_type=kind, vectors=new_index.ntotal)
+    return new_index
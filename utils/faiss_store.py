@@ -0,0 +1,185 @@
+from __future__ import annotations
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import faiss
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+
+from utils.model_loader import MODEL_REGISTRY
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+INDEX_FILE = "index.faiss"
+PICKLE_FILE = "index.pkl"
+DOCSTORE_FILE = "docstore.sqlite"
+STORAGE_MODES = {"pickle", "mmap"}
+
+def storage_mode(config: Optional[dict] = None) -> str:
+    """
+    faiss_db.storage from config.yaml: "pickle" (LangChain save_local) or "mmap"
+    (memory-mapped index.faiss + SQLite docstore).
+    """
+    config = config if config is not None else MODEL_REGISTRY.get_config()
+    mode = (config.get("faiss_db") or {}).get("storage", "pickle")
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"Unsupported faiss_db.storage '{mode}', expected one of {sorted(STORAGE_MODES)}")
+    return mode
+
+class _SQLiteConnection:
+    """
+    A SQLite connection shared by the docstore and the position map of one index.
+    Writes stay in an open transaction until commit(), so readers never see rows
+    whose vectors are not yet in the saved index.
+    """
+
+    def __init__(self, path: Path, read_only: bool):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS docs (id TEXT PRIMARY KEY, content TEXT NOT NULL, metadata TEXT NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS positions (pos INTEGER PRIMARY KEY, id TEXT NOT NULL)")
+            self.conn.commit()
+
+    def commit(self) -> None:
+        with self.lock:
+            self.conn.commit()
+
+class SQLiteDocstore(Docstore, AddableMixin):
+    """
+    Docstore that keeps chunk text and metadata in SQLite and fetches them by id on demand.
+    """
+
+    def __init__(self, db: _SQLiteConnection):
+        self.db = db
+
+    def add(self, texts: Dict[str, Document]) -> None:
+        rows = [(id_, doc.page_content, json.dumps(doc.metadata or {}, ensure_ascii=False, default=str))
+                for id_, doc in texts.items()]
+        with self.db.lock:
+            self.db.conn.executemany("INSERT INTO docs (id, content, metadata) VALUES (?, ?, ?)", rows)
+
+    def delete(self, ids: List) -> None:
+        with self.db.lock:
+            self.db.conn.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+
+    def search(self, search: str) -> Union[str, Document]:
+        with self.db.lock:
+            row = self.db.conn.execute("SELECT content, metadata FROM docs WHERE id = ?", (search,)).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(id=search, page_content=row[0], metadata=json.loads(row[1]))
+
+class SQLitePositionMap(MutableMapping):
+    """
+    Lazy replacement for FAISS.index_to_docstore_id: maps vector position -> docstore id in SQLite.
+    """
+
+    def __init__(self, db: _SQLiteConnection):
+        self.db = db
+
+    def __getitem__(self, pos) -> str:
+        with self.db.lock:
+            row = self.db.conn.execute("SELECT id FROM positions WHERE pos = ?", (int(pos),)).fetchone()
+        if row is None:
+            raise KeyError(pos)
+        return row[0]
+
+    def __setitem__(self, pos, id_: str) -> None:
+        with self.db.lock:
+            self.db.conn.execute("INSERT OR REPLACE INTO positions (pos, id) VALUES (?, ?)", (int(pos), id_))
+
+    def __delitem__(self, pos) -> None:
+        with self.db.lock:
+            self.db.conn.execute("DELETE FROM positions WHERE pos = ?", (int(pos),))
+
+    def __iter__(self) -> Iterator[int]:
+        with self.db.lock:
+            rows = self.db.conn.execute("SELECT pos FROM positions ORDER BY pos").fetchall()
+        return iter(r[0] for r in rows)
+
+    def __len__(self) -> int:
+        with self.db.lock:
+            return self.db.conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def update(self, other=(), **kwargs) -> None:
+        items = dict(other, **kwargs)
+        with self.db.lock:
+            self.db.conn.executemany("INSERT OR REPLACE INTO positions (pos, id) VALUES (?, ?)",
+                                     [(int(p), i) for p, i in items.items()])
+
+def store_exists(index_dir) -> bool:
+    d = Path(index_dir)
+    return (d / INDEX_FILE).exists() and ((d / PICKLE_FILE).exists() or (d / DOCSTORE_FILE).exists())
+
+def store_files(index_dir) -> List[Path]:
+    """
+    Files making up a persisted store; index.faiss is replaced on every save.
+    """
+    d = Path(index_dir)
+    return [d / name for name in (INDEX_FILE, PICKLE_FILE, DOCSTORE_FILE) if (d / name).exists()]
+
+def _read_index(path: Path, mmap: bool) -> faiss.Index:
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+        try:
+            return faiss.read_index(str(path), flags)
+        except RuntimeError as e:
+            log.warning("Memory-mapped read not supported for this index, reading into memory", path=str(path), error=str(e)[:200])
+    return faiss.read_index(str(path))
+
+def load_vectorstore(index_dir, embeddings: Embeddings, *, mmap: bool = False) -> FAISS:
+    """
+    Load a persisted store in whichever format it was saved.
+    mmap=True opens the index read-only and memory-mapped (for query paths).
+    """
+    d = Path(index_dir)
+    if (d / DOCSTORE_FILE).exists():
+        db = _SQLiteConnection(d / DOCSTORE_FILE, read_only=mmap)
+        index = _read_index(d / INDEX_FILE, mmap)
+        return FAISS(embeddings, index, SQLiteDocstore(db), SQLitePositionMap(db))
+    return FAISS.load_local(
+        str(d),
+        embeddings,
+        allow_dangerous_deserialization = True # Only use this if you trust the source of the index
+    )
+
+def create_vectorstore(index_dir, embeddings: Embeddings,
+                       text_embeddings: List[Tuple[str, List[float]]],
+                       metadatas: List[dict], mode: Optional[str] = None) -> FAISS:
+    """
+    Create a new store for index_dir in the configured storage mode and add the first vectors.
+    """
+    mode = mode or storage_mode()
+    if mode == "pickle":
+        return FAISS.from_embeddings(text_embeddings, embeddings, metadatas = metadatas)
+    db = _SQLiteConnection(Path(index_dir) / DOCSTORE_FILE, read_only=False)
+    vs = FAISS(embeddings, faiss.IndexFlatL2(len(text_embeddings[0][1])), SQLiteDocstore(db), SQLitePositionMap(db))
+    vs.add_embeddings(text_embeddings, metadatas = metadatas)
+    return vs
+
+def save_vectorstore(vs: FAISS, index_dir) -> None:
+    """
+    Persist a store. In mmap mode the docstore transaction is committed first and
+    index.faiss is replaced atomically, so readers with the old file mapped are unaffected.
+    """
+    d = Path(index_dir)
+    if isinstance(vs.docstore, SQLiteDocstore):
+        vs.docstore.db.commit()
+        tmp = d / (INDEX_FILE + ".tmp")
+        faiss.write_index(vs.index, str(tmp))
+        os.replace(tmp, d / INDEX_FILE)
+    else:
+        vs.save_local(str(d))
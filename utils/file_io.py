@@ -1,17 +1,26 @@
+import os
 import uuid
 import hashlib
 import shutil
 import re
 from pathlib import Path
 from datetime import datetime, timezone
-from typing import Iterable, List, Optional, Dict, Any
+from typing import Iterable, Iterator, List, Optional, Dict, Any, Tuple
 from utils.model_loader import ModelLoader
+from utils.metrics import span, count_items
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 log = CustomLogger().get_logger(__name__)
 
 SUPPORTED_EXTENSIONS = {'.pdf', '.txt', '.docx'}
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_FILE_BYTES = int(os.getenv("MAX_UPLOAD_FILE_MB", "50")) * 1024 * 1024
+MAX_UPLOAD_REQUEST_BYTES = int(os.getenv("MAX_UPLOAD_REQUEST_MB", "200")) * 1024 * 1024
+
+class UploadLimitExceeded(ValueError):
+    """Raised when an upload exceeds the per-file or per-request size limit."""
+
 #HELPERS (FILE I/O + LOADING)
 
 def _session_id(prefix: str = "session") -> str:
@@ -20,11 +29,83 @@ def _session_id(prefix: str = "session") -> str:
     """
     return f"{prefix}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
 
-def save_uploaded_files(uploaded_files: Iterable, target_dir: Path) -> List[Path]:
-    """Save uploaded files (Streamlit-like) and return local paths."""
+def _iter_upload_chunks(uploaded_file, chunk_size: int) -> Iterator[bytes]:
+    """Yield the upload in fixed-size chunks without materializing it in memory."""
+    if hasattr(uploaded_file, "read"):
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+        while True:
+            chunk = uploaded_file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    else:
+        buf = memoryview(uploaded_file.getbuffer())  # fallback
+        for i in range(0, len(buf), chunk_size):
+            yield buf[i:i + chunk_size]
+
+def stream_upload_to_file(uploaded_file, out: Path, *,
+                          max_bytes: Optional[int] = None,
+                          chunk_size: int = UPLOAD_CHUNK_SIZE) -> Tuple[int, str]:
+    """
+    Stream an upload to out in fixed-size chunks, computing its sha256 in the same pass.
+    Returns (bytes_written, sha256). The partial file is removed if max_bytes is exceeded.
+    """
+    out = Path(out)
+    tmp = out.with_name(out.name + ".part")
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in _iter_upload_chunks(uploaded_file, chunk_size):
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise UploadLimitExceeded(
+                        f"Upload '{getattr(uploaded_file, 'name', out.name)}' exceeds the size limit of {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+        os.replace(tmp, out)
+        return written, digest.hexdigest()
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+class UploadBudget:
+    """Tracks per-file and per-request byte limits across the files of one request."""
+    def __init__(self, max_file_bytes: Optional[int] = None, max_request_bytes: Optional[int] = None):
+        self.max_file_bytes = MAX_UPLOAD_FILE_BYTES if max_file_bytes is None else max_file_bytes
+        self.max_request_bytes = MAX_UPLOAD_REQUEST_BYTES if max_request_bytes is None else max_request_bytes
+        self.used = 0
+
+    def save(self, uploaded_file, out: Path) -> Tuple[int, str]:
+        remaining = self.max_request_bytes - self.used
+        if remaining <= 0:
+            raise UploadLimitExceeded(f"Request exceeds the upload limit of {self.max_request_bytes} bytes")
+        limit = min(self.max_file_bytes, remaining)
+        try:
+            size, sha = stream_upload_to_file(uploaded_file, out, max_bytes=limit)
+        except UploadLimitExceeded:
+            if limit < self.max_file_bytes:
+                raise UploadLimitExceeded(f"Request exceeds the upload limit of {self.max_request_bytes} bytes")
+            raise
+        self.used += size
+        return size, sha
+
+def remove_saved_files(paths: Iterable[Path]) -> None:
+    """Delete files already written for a request that is being rejected."""
+    for p in paths:
+        Path(p).unlink(missing_ok=True)
+
+@span("save_uploaded_files")
+def save_uploaded_files(uploaded_files: Iterable, target_dir: Path, budget: Optional[UploadBudget] = None) -> List[Path]:
+    """
+    Stream uploaded files (Streamlit-like) to disk within the size limits and return local paths.
+    If any file fails or a limit is hit, the files already saved for this call are deleted.
+    """
+    saved: List[Path] = []
     try:
         target_dir.mkdir(parents=True, exist_ok=True)
-        saved: List[Path] = []
+        budget = budget or UploadBudget()
         for uf in uploaded_files:
             name = getattr(uf, "name", "file")
             ext = Path(name).suffix.lower()
@@ -36,14 +117,15 @@ def save_uploaded_files(uploaded_files: Iterable, target_dir: Path) -> List[Path
             fname = f"{safe_name}_{uuid.uuid4().hex[:6]}{ext}"
             fname = f"{uuid.uuid4().hex[:8]}{ext}"
             out = target_dir / fname
-            with open(out, "wb") as f:
-                if hasattr(uf, "read"):
-                    f.write(uf.read())
-                else:
-                    f.write(uf.getbuffer())  # fallback
+            size, sha256 = budget.save(uf, out)
             saved.append(out)
-            log.info("File saved for ingestion", uploaded=name, saved_as=str(out))
+            log.info("File saved for ingestion", uploaded=name, saved_as=str(out), bytes=size, sha256=sha256)
+        count_items("save_uploaded_files", len(saved))
         return saved
+    except UploadLimitExceeded:
+        remove_saved_files(saved)
+        raise
     except Exception as e:
+        remove_saved_files(saved)
         log.error("Failed to save uploaded files", error=str(e), dir=str(target_dir))
         raise DocumentPortalException("Failed to save uploaded files", e) from e
\ No newline at end of file
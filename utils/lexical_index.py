@@ -0,0 +1,255 @@
+from __future__ import annotations
+import re
+import json
+import math
+import sqlite3
+import threading
+from pathlib import Path
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from langchain_community.vectorstores import FAISS
+
+from utils.model_loader import MODEL_REGISTRY
+from utils.vectorstore_cache import get_vectorstore_cache
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+LEXICAL_FILE = "lexical.sqlite"
+
+#Keeps identifiers such as "7.2.1", "A-1234" or "v2/api" as single tokens
+_TOKEN = re.compile(r"[a-z0-9]+(?:[._\-/][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were "
+    "will with what which who how when where why do does did".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased terms of text; compound identifiers are indexed whole and by their parts.
+    """
+    terms: List[str] = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        terms.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p not in _STOPWORDS)
+    return terms
+
+def hybrid_config(config: Optional[dict] = None) -> Dict[str, Any]:
+    config = config if config is not None else MODEL_REGISTRY.get_config()
+    return (config.get("retriever") or {}).get("hybrid") or {}
+
+class LexicalIndex:
+    """
+    Persistent BM25 inverted index stored in SQLite next to the FAISS index. Postings and
+    collection statistics are updated incrementally on add(); the database is only opened
+    on first use and queries read just the posting lists of the query terms.
+    """
+
+    def __init__(self, index_dir, k1: float = 1.5, b: float = 0.75):
+        self.path = Path(index_dir) / LEXICAL_FILE
+        self.k1 = k1
+        self.b = b
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs (id INTEGER PRIMARY KEY, key TEXT UNIQUE NOT NULL,"
+                " content TEXT NOT NULL, metadata TEXT NOT NULL, length INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings (term TEXT NOT NULL, doc INTEGER NOT NULL, tf INTEGER NOT NULL,"
+                " PRIMARY KEY (term, doc)) WITHOUT ROWID"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+            conn.execute("CREATE TABLE IF NOT EXISTS stats (id INTEGER PRIMARY KEY CHECK (id = 0), docs INTEGER NOT NULL, total_length INTEGER NOT NULL)")
+            conn.execute("INSERT OR IGNORE INTO stats (id, docs, total_length) VALUES (0, 0, 0)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db().execute("SELECT docs FROM stats WHERE id = 0").fetchone()[0]
+
+    def add(self, docs: List[Document], keys: List[str]) -> int:
+        """
+        Index docs under their dedup keys (keys already present are skipped) in one transaction.
+        """
+        added = 0
+        with self._lock:
+            conn = self._db()
+            try:
+                for doc, key in zip(docs, keys):
+                    terms = Counter(tokenize(doc.page_content))
+                    length = sum(terms.values())
+                    cur = conn.execute(
+                        "INSERT OR IGNORE INTO docs (key, content, metadata, length) VALUES (?, ?, ?, ?)",
+                        (key, doc.page_content, json.dumps(doc.metadata or {}, ensure_ascii=False, default=str), length))
+                    if cur.rowcount == 0:
+                        continue
+                    doc_id = cur.lastrowid
+                    conn.executemany("INSERT INTO postings (term, doc, tf) VALUES (?, ?, ?)",
+                                     [(t, doc_id, tf) for t, tf in terms.items()])
+                    conn.executemany("INSERT INTO terms (term, df) VALUES (?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                                     [(t,) for t in terms])
+                    conn.execute("UPDATE stats SET docs = docs + 1, total_length = total_length + ? WHERE id = 0", (length,))
+                    added += 1
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return added
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Document, float]]:
+        """
+        Top-k documents by BM25 score for query.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.exists():
+            return []
+        marks = ",".join("?" * len(terms))
+        with self._lock:
+            conn = self._db()
+            n_docs, total_length = conn.execute("SELECT docs, total_length FROM stats WHERE id = 0").fetchone()
+            if n_docs == 0:
+                return []
+            df = dict(conn.execute(f"SELECT term, df FROM terms WHERE term IN ({marks})", terms).fetchall())
+            rows = conn.execute(
+                f"SELECT p.doc, p.term, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc WHERE p.term IN ({marks})",
+                terms).fetchall()
+
+            avgdl = total_length / n_docs
+            scores: Dict[int, float] = {}
+            for doc_id, term, tf, length in rows:
+                idf = math.log(1 + (n_docs - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * length / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            top = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:k]
+            if not top:
+                return []
+            ids = [doc_id for doc_id, _ in top]
+            found = {
+                row[0]: Document(page_content=row[1], metadata=json.loads(row[2]))
+                for row in conn.execute(
+                    f"SELECT id, content, metadata FROM docs WHERE id IN ({','.join('?' * len(ids))})", ids)
+            }
+        return [(found[doc_id], score) for doc_id, score in top]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+def _fusion_key(doc: Document) -> Tuple[str, str]:
+    return doc.page_content, json.dumps(doc.metadata or {}, sort_keys=True, default=str)
+
+def reciprocal_rank_fusion(result_lists: List[List[Document]], k: int, rrf_k: int = 60) -> List[Document]:
+    """
+    Merge ranked lists: each document scores sum(1 / (rrf_k + rank)) over the lists it appears in.
+    """
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for results in result_lists:
+        for rank, doc in enumerate(results, start=1):
+            key = _fusion_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    ranked = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[key] for key in ranked]
+
+class HybridRetriever(BaseRetriever):
+    """
+    Runs the dense FAISS search and the BM25 lexical search for a query and merges
+    both candidate lists with reciprocal rank fusion.
+    """
+
+    vectorstore: FAISS
+    lexical: LexicalIndex
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        fetch_k = max(self.fetch_k, self.k)
+        dense = self.vectorstore.similarity_search(query, k=fetch_k)
+        sparse = [doc for doc, _ in self.lexical.search(query, k=fetch_k)]
+        return reciprocal_rank_fusion([dense, sparse], self.k, self.rrf_k)
+
+def make_retriever(vectorstore: FAISS, index_dir, k: int = 5, config: Optional[dict] = None) -> BaseRetriever:
+    """
+    Hybrid dense + BM25 retriever when retriever.hybrid is enabled and the index directory
+    has a lexical index; plain similarity search otherwise.
+    """
+    cfg = hybrid_config(config)
+    lexical = LexicalIndex(index_dir, k1=float(cfg.get("bm25_k1", 1.5)), b=float(cfg.get("bm25_b", 0.75)))
+    if not cfg.get("enabled", False) or not lexical.exists():
+        return vectorstore.as_retriever(search_type = "similarity", search_kwargs = {"k": k})
+    return HybridRetriever(
+        vectorstore = vectorstore,
+        lexical = lexical,
+        k = k,
+        fetch_k = int(cfg.get("fetch_k", 20)),
+        rrf_k = int(cfg.get("rrf_k", 60)),
+    )
+
+class CachedIndexRetriever(BaseRetriever):
+    """
+    Retriever over an index directory that takes the FAISS store from the vector store cache
+    on every query instead of holding it, so long-lived retrievers pick up a changed index and
+    do not keep stores the cache has evicted in memory. Dense and BM25 candidates are fused
+    with reciprocal rank fusion when hybrid is set and the directory has a lexical index.
+    """
+
+    index_dir: str
+    embeddings: Embeddings
+    lexical: LexicalIndex
+    hybrid: bool = False
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        vectorstore = get_vectorstore_cache().get(self.index_dir, self.embeddings)
+        if not self.hybrid or not self.lexical.exists():
+            return vectorstore.similarity_search(query, k=self.k)
+        fetch_k = max(self.fetch_k, self.k)
+        dense = vectorstore.similarity_search(query, k=fetch_k)
+        sparse = [doc for doc, _ in self.lexical.search(query, k=fetch_k)]
+        return reciprocal_rank_fusion([dense, sparse], self.k, self.rrf_k)
+
+def make_cached_retriever(index_dir, embeddings: Embeddings, k: int = 5,
+                          config: Optional[dict] = None) -> CachedIndexRetriever:
+    cfg = hybrid_config(config)
+    return CachedIndexRetriever(
+        index_dir = str(index_dir),
+        embeddings = embeddings,
+        lexical = LexicalIndex(index_dir, k1=float(cfg.get("bm25_k1", 1.5)), b=float(cfg.get("bm25_b", 0.75))),
+        hybrid = bool(cfg.get("enabled", False)),
+        k = k,
+        fetch_k = int(cfg.get("fetch_k", 20)),
+        rrf_k = int(cfg.get("rrf_k", 60)),
+    )
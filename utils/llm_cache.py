@@ -0,0 +1,123 @@
+from __future__ import annotations
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, Generation, GenerationChunk
+
+from utils.metrics import record_cache
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+#Only what an LLM call returns may be revived from the cache file; anything else is rejected unread
+_CACHED_TYPES = [Generation, GenerationChunk, ChatGeneration, ChatGenerationChunk, AIMessage, AIMessageChunk]
+
+class SQLiteLLMCache(BaseCache):
+    """
+    Persistent LLM response cache. Entries are keyed by provider, model, temperature and a
+    sha256 of the rendered prompt (plus LangChain's serialized model params), expire after
+    ttl_seconds and are evicted least-recently-used beyond max_entries.
+    """
+
+    def __init__(self, path: str, provider: str, model_name: str, temperature: float,
+                 ttl_seconds: Optional[int] = 7 * 24 * 3600, max_entries: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.namespace = f"{provider}:{model_name}:{temperature}"
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, namespace TEXT NOT NULL, created REAL NOT NULL,"
+            " last_access REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_access ON llm_cache (last_access)")
+        self._conn.commit()
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{self.namespace}\0{llm_string}\0{prompt_hash}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created, value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl_seconds is not None and now - row[0] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                record_cache("llm", misses=1)
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+        record_cache("llm", hits=1)
+        try:
+            return list(loads(row[1], allowed_objects=_CACHED_TYPES, secrets_from_env=False))
+        except Exception as e:
+            log.warning("Unreadable LLM cache entry ignored", error=str(e))
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        key = self._key(prompt, llm_string)
+        value = dumps(list(return_val))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, namespace, created, last_access, value) VALUES (?, ?, ?, ?, ?)",
+                (key, self.namespace, now, now, value))
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                    (excess,))
+                self.evictions += excess
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"namespace": self.namespace, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+def build_llm_cache(config: dict, provider: str, model_name: str, temperature: float) -> Optional[SQLiteLLMCache]:
+    """
+    Return a cache for this model when llm_cache is enabled in config.yaml and the model is
+    deterministic (temperature 0); otherwise None.
+    """
+    cfg = config.get("llm_cache") or {}
+    if not cfg.get("enabled", False):
+        return None
+    if temperature != 0:
+        log.info("LLM cache skipped for non-deterministic model", provider=provider, model_name=model_name,
+                 temperature=temperature)
+        return None
+    ttl = cfg.get("ttl_seconds", 7 * 24 * 3600)
+    return SQLiteLLMCache(
+        path = cfg.get("path", "cache/llm_cache.sqlite"),
+        provider = provider,
+        model_name = model_name,
+        temperature = temperature,
+        ttl_seconds = int(ttl) if ttl is not None else None,
+        max_entries = int(cfg.get("max_entries", 10000)),
+    )
@@ -0,0 +1,73 @@
+from __future__ import annotations
+import re
+import math
+import hashlib
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_TOKEN = re.compile(r"\w+(?:[.\-/]\w+)*")
+_MAX_BUCKET_CACHE = 500_000
+
+class HashingEmbeddings(Embeddings):
+    """
+    In-process embeddings from signed feature hashing: word n-grams are hashed (blake2b, so
+    vectors are stable across processes and machines) into dim buckets, weighted 1 + log(tf)
+    and L2-normalized. Stateless, so no fitting step and identical output for ingestion and queries.
+    """
+
+    def __init__(self, dim: int = 768, ngram_range: Sequence[int] = (1, 2), lowercase: bool = True):
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        self.dim = int(dim)
+        self.min_n, self.max_n = int(ngram_range[0]), int(ngram_range[1])
+        self.lowercase = lowercase
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    def _features(self, text: str) -> Counter:
+        words = _TOKEN.findall(text.lower() if self.lowercase else text)
+        grams: Counter = Counter()
+        for n in range(self.min_n, self.max_n + 1):
+            if n == 1:
+                grams.update(words)
+            else:
+                grams.update(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+        return grams
+
+    def _bucket(self, feature: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(feature)
+        if bucket is None:
+            h = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = (h % self.dim, 1.0 if h >> 63 else -1.0)
+            if len(self._buckets) >= _MAX_BUCKET_CACHE:
+                self._buckets.clear()
+            self._buckets[feature] = bucket
+        return bucket
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into a (len(texts), dim) float32 matrix.
+        """
+        rows: List[int] = []
+        cols: List[int] = []
+        vals: List[float] = []
+        for r, text in enumerate(texts):
+            for feature, count in self._features(text).items():
+                col, sign = self._bucket(feature)
+                rows.append(r)
+                cols.append(col)
+                vals.append(sign * (1.0 + math.log(count)))
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        if vals:
+            np.add.at(matrix, (np.asarray(rows), np.asarray(cols)), np.asarray(vals, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_array([text])[0].tolist()
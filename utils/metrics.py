@@ -0,0 +1,197 @@
+from __future__ import annotations
+import time
+import bisect
+import threading
+from contextlib import ContextDecorator
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in items) + "}"
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.total += value
+        self.count += 1
+
+class MetricsRegistry:
+    """
+    Thread-safe in-process counters and histograms, rendered in the Prometheus text format.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1.0, help: str = "", **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._help.setdefault(name, ("counter", help))
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, help: str = "", **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._help.setdefault(name, ("histogram", help))
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(self.buckets)
+            hist.observe(value)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text or name}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name, series in sorted(self._histograms.items()):
+                kind, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text or name}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(hist.total)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._help.clear()
+            self._counters.clear()
+            self._histograms.clear()
+
+METRICS = MetricsRegistry()
+
+STAGE_SECONDS = "docportal_stage_duration_seconds"
+STAGE_ERRORS = "docportal_stage_errors_total"
+STAGE_ITEMS = "docportal_stage_items_total"
+CACHE_REQUESTS = "docportal_cache_requests_total"
+LLM_CALLS = "docportal_llm_calls_total"
+LLM_SECONDS = "docportal_llm_call_duration_seconds"
+LLM_TOKENS = "docportal_llm_tokens_total"
+HTTP_SECONDS = "docportal_http_request_duration_seconds"
+
+class span(ContextDecorator):
+    """
+    Time a pipeline stage (as `with span("load_documents"):` or as a decorator), recording
+    its duration histogram and, on exceptions, an error counter.
+    """
+
+    def __init__(self, stage: str, registry: Optional[MetricsRegistry] = None):
+        self.stage = stage
+        self.registry = registry or METRICS
+        self._start = 0.0
+
+    def _recreate_cm(self) -> "span":
+        #Each decorated call gets its own timer, so concurrent calls do not share a start time
+        return span(self.stage, self.registry)
+
+    def __enter__(self) -> "span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.registry.observe(STAGE_SECONDS, time.perf_counter() - self._start, "Duration of pipeline stages", stage=self.stage)
+        if exc_type is not None:
+            self.registry.inc(STAGE_ERRORS, 1, "Pipeline stage failures", stage=self.stage)
+        return False
+
+def record_stage(stage: str, seconds: float) -> None:
+    METRICS.observe(STAGE_SECONDS, seconds, "Duration of pipeline stages", stage=stage)
+
+def count_items(stage: str, n: int) -> None:
+    METRICS.inc(STAGE_ITEMS, n, "Items (files, pages, chunks, queries) processed per stage", stage=stage)
+
+def record_cache(cache: str, hits: int = 0, misses: int = 0) -> None:
+    if hits:
+        METRICS.inc(CACHE_REQUESTS, hits, "Cache lookups by cache and result", cache=cache, result="hit")
+    if misses:
+        METRICS.inc(CACHE_REQUESTS, misses, "Cache lookups by cache and result", cache=cache, result="miss")
+
+class LLMMetricsCallback(BaseCallbackHandler):
+    """
+    Callback attached to every LLM client: counts calls, times them and adds up prompt and
+    completion tokens from the provider's usage metadata.
+    """
+
+    def __init__(self, provider: str, model: str, registry: Optional[MetricsRegistry] = None):
+        self.provider = provider
+        self.model = model
+        self.registry = registry or METRICS
+        self._starts: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any) -> None:
+        self._starts[run_id] = time.perf_counter()
+
+    def _finish(self, run_id: UUID, status: str) -> None:
+        start = self._starts.pop(run_id, None)
+        labels = {"provider": self.provider, "model": self.model}
+        self.registry.inc(LLM_CALLS, 1, "LLM calls by outcome", status=status, **labels)
+        if start is not None:
+            self.registry.observe(LLM_SECONDS, time.perf_counter() - start, "LLM call latency", **labels)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "ok")
+        prompt_tokens = completion_tokens = 0
+        for generations in response.generations:
+            for gen in generations:
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None) or {}
+                prompt_tokens += usage.get("input_tokens", 0)
+                completion_tokens += usage.get("output_tokens", 0)
+        if not (prompt_tokens or completion_tokens):
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        labels = {"provider": self.provider, "model": self.model}
+        if prompt_tokens:
+            self.registry.inc(LLM_TOKENS, prompt_tokens, "LLM tokens by kind", kind="prompt", **labels)
+        if completion_tokens:
+            self.registry.inc(LLM_TOKENS, completion_tokens, "LLM tokens by kind", kind="completion", **labels)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._finish(run_id, "error")
@@ -1,5 +1,7 @@
 import os
 import sys
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
 from dotenv import load_dotenv
 
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
@@ -8,102 +10,212 @@ from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
 
 from utils.config_loader import load_config
+from utils.llm_cache import build_llm_cache
+from utils.metrics import LLMMetricsCallback
+from utils.local_embeddings import HashingEmbeddings
 from logger.custom_logger import CustomLogger
 from exception.custom_exception import DocumentPortalException
 
 log = CustomLogger().get_logger(__name__)
 
-class ModelLoader:
+class ModelRegistry:
     """
-    A utility class to load embedding models and LLM models
+    Thread-safe, process-wide registry of configuration and model clients.
+    Each (kind, provider, model, params) client is built once and reused until reload() is called.
     """
 
     def __init__(self):
+        self._lock = threading.RLock()
+        self._config: Optional[dict] = None
+        self._env_loaded = False
+        self._env_override = False
+        self._clients: Dict[Tuple, Any] = {}
+
+    def get_config(self) -> dict:
+        """
+        Load .env and config.yaml on first use, then return the cached config.
+        """
+        if self._config is None:
+            with self._lock:
+                if self._config is None:
+                    if not self._env_loaded:
+                        #After reload(), values changed in .env replace the ones already in os.environ
+                        load_dotenv(override = self._env_override)
+                        self._env_loaded = True
+                    self._config = load_config()
+                    log.info("Configuration loaded successfully", config_keys=list(self._config.keys()))
+        return self._config
+
+    def get_or_create(self, key: Tuple[Hashable, ...], factory: Callable[[], Any]) -> Any:
+        """
+        Return the client cached under key, building it with factory on first use.
+        """
+        client = self._clients.get(key)
+        if client is not None:
+            return client
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = factory()
+                self._clients[key] = client
+                log.info("Model client created", key=[str(k) for k in key[:3]])
+            return client
+
+    def reload(self) -> None:
+        """
+        Drop cached config and clients so the next lookup re-reads .env (overriding values
+        loaded from it before) and config.yaml.
+        Only config and model clients are reloaded: process-wide services built from config
+        (vector store cache, PDF extractor, embedding store, session pool, ingestion jobs,
+        session janitor, logging) keep the settings they started with until the process restarts.
+        """
+        with self._lock:
+            self._config = None
+            self._env_loaded = False
+            self._env_override = True
+            self._clients.clear()
+        log.info("Model registry cleared")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"clients": len(self._clients), "config_loaded": self._config is not None}
 
-        load_dotenv()
+MODEL_REGISTRY = ModelRegistry()
+
+class ModelLoader:
+    """
+    A utility class to load embedding models and LLM models.
+    Config and clients come from the process-wide MODEL_REGISTRY, so constructing it is cheap.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or MODEL_REGISTRY
+        self.config = self.registry.get_config()
         self._validate_env()
-        self.config = load_config()
-        log.info("Configuration loaded successfully", config_keys=list(self.config.keys()))
+
+    @classmethod
+    def reload(cls, registry: Optional[ModelRegistry] = None) -> None:
+        """
+        Explicitly reload config and rebuild model clients on next use.
+        """
+        (registry or MODEL_REGISTRY).reload()
+
+    def _required_env_vars(self) -> list:
+        """
+        API keys needed by the configured embedding provider, the selected LLM provider and the
+        question-rewrite LLM (chat.rewrite_llm).
+        """
+        provider_keys = {"google": "GOOGLE_API_KEY", "groq": "GROQ_API_KEY"}
+        embedding_provider = (self.config.get("embedding_model") or {}).get("provider", "google")
+        llms = self.config.get("llm") or {}
+        llm_keys = {os.getenv("LLM_PROVIDER", "groq"), (self.config.get("chat") or {}).get("rewrite_llm")}
+        required = {provider_keys.get(embedding_provider)}
+        required.update(provider_keys.get((llms.get(key) or {}).get("provider")) for key in llm_keys if key)
+        return sorted(key for key in required if key)
 
     def _validate_env(self):
         """
         Validate the necessary environment variables for model loading.
         """
-        required_vars = ['GOOGLE_API_KEY', 'GROQ_API_KEY']
-        self.api_keys = {key: os.getenv(key) for key in required_vars}
+        self.api_keys = {key: os.getenv(key) for key in ('GOOGLE_API_KEY', 'GROQ_API_KEY')}
 
-        missing_vars = [key for key, value in self.api_keys.items() if not value]
+        missing_vars = [key for key in self._required_env_vars() if not self.api_keys.get(key)]
         if missing_vars:
             log.error(f"Missing environment variables", missing_vars=missing_vars)
             raise DocumentPortalException("Missing required environment variables", sys)
-        
-        log.info("environment variables validated successfully", available_keys=list(
-            key for key in self.api_keys.keys() if self.api_keys[key]))
 
     def load_embeddings(self):
         """
         Load and return the embedding model.
+        provider "local" selects the in-process hashing embeddings (no network, fixed dimension).
         """
         try:
-            log.info("Loading embedding model....")
-            model_name = self.config["embedding_model"]["model_name"]
-            return GoogleGenerativeAIEmbeddings(model = model_name)
+            emb_config = self.config["embedding_model"]
+            provider = emb_config.get("provider", "google")
+            if provider == "local":
+                local = emb_config.get("local") or {}
+                dim = int(local.get("dim", 768))
+                ngram_range = tuple(local.get("ngram_range", (1, 2)))
+                key = ("embeddings", "local", dim, ngram_range)
+                return self.registry.get_or_create(key, lambda: HashingEmbeddings(dim = dim, ngram_range = ngram_range))
+            if provider != "google":
+                raise ValueError(f"Unsupported embedding provider: {provider}")
+            model_name = emb_config["model_name"]
+            key = ("embeddings", "google", model_name)
+            return self.registry.get_or_create(key, lambda: GoogleGenerativeAIEmbeddings(model = model_name))
         except Exception as e:
             log.error("Failed to load embedding model", error=str(e))
             raise DocumentPortalException("Failed to load embedding model", sys)
 
-    def load_llm(self):
+    def load_llm(self, provider_key: Optional[str] = None):
         """
         Load and return the LLM model.
-        Loads LLM dynamically based on provider in config.
+        Loads LLM dynamically based on provider in config; provider_key selects an entry
+        under llm: explicitly (e.g. a smaller model for question rewriting).
         """
         llm_block = self.config['llm']
-        
+
         #Default provider or choose from the ENV var
-        provider_key = os.getenv("LLM_PROVIDER", 'groq') #Default groq; Set the provider in env file.
+        provider_key = provider_key or os.getenv("LLM_PROVIDER", 'groq') #Default groq; Set the provider in env file.
 
         if provider_key not in llm_block:
             log.error("LLM provider not found in config", provider_key = provider_key)
             raise ValueError(f"LLM provider '{provider_key}' not found in config")
-        
+
         llm_config = llm_block[provider_key]
         provider = llm_config.get("provider")
         model_name = llm_config.get("model_name")
         temperature = llm_config.get("temperature", 0.2)
         max_tokens = llm_config.get("max_tokens", 2048)
 
+        if provider not in ('google', 'groq', 'openai'):
+            log.error("Unsupported LLM provider", provider=provider)
+            raise ValueError(f"Unsupported LLM provider: {provider}")
+
+        key = ("llm", provider, model_name, temperature, max_tokens)
+        return self.registry.get_or_create(
+            key, lambda: self._build_llm(provider, model_name, temperature, max_tokens))
+
+    def _build_llm(self, provider: str, model_name: str, temperature: float, max_tokens: int):
         log.info("Loading LLM model", provider=provider, model_name=model_name,
                  temperature=temperature, max_tokens=max_tokens)
-        
+
+        #Opt-in response cache; only attached to deterministic (temperature 0) models
+        cache = build_llm_cache(self.config, provider, model_name, temperature)
+        #Call counts, latency and token usage for /metrics
+        callbacks = [LLMMetricsCallback(provider, model_name)]
+
         if provider == 'google':
             llm = ChatGoogleGenerativeAI(
                 model = model_name,
                 api_key = self.api_keys['GOOGLE_API_KEY'],
                 temperature=temperature,
+                cache = cache,
+                callbacks = callbacks,
             )
             return llm
-        
+
         elif provider == 'groq':
             llm = ChatGroq(
                 model = model_name,
                 api_key = self.api_keys['GROQ_API_KEY'],
                 temperature = temperature,
+                cache = cache,
+                callbacks = callbacks,
             )
-            return llm 
+            return llm
 
         elif provider == 'openai':
             llm = ChatOpenAI(
                 model_name = model_name,
-                api_key = self.api_keys["OPENAI_API_KEY"],
+                api_key = os.getenv("OPENAI_API_KEY"),
                 temperature = temperature,
-                max_tokens = max_tokens
+                max_tokens = max_tokens,
+                cache = cache,
+                callbacks = callbacks,
             )
             return llm
-        
-        else:
-            log.error("Unsupported LLM provider", provider=provider)
-            raise ValueError(f"Unsupported LLM provider: {provider}")
-        
+
 if __name__ == "__main__":
     loader = ModelLoader()
 
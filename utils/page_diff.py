@@ -0,0 +1,152 @@
+from __future__ import annotations
+import re
+import difflib
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+IDENTICAL = "identical"
+CHANGED = "changed"
+ADDED = "added"
+REMOVED = "removed"
+
+_WS = re.compile(r"\s+")
+
+@dataclass
+class PageDiff:
+    """Alignment of one reference page with one actual page (either side may be missing)."""
+    status: str
+    ref_page: Optional[int]
+    act_page: Optional[int]
+    diff: str = ""
+
+    @property
+    def label(self) -> str:
+        if self.status == ADDED:
+            return f"{self.act_page} (added)"
+        if self.status == REMOVED:
+            return f"{self.ref_page} (removed)"
+        if self.act_page == self.ref_page:
+            return str(self.ref_page)
+        return f"{self.ref_page} -> {self.act_page}"
+
+def _normalize(text: str) -> str:
+    return _WS.sub(" ", text).strip()
+
+def _page_hash(text: str) -> str:
+    return hashlib.sha256(_normalize(text).encode("utf-8")).hexdigest()
+
+def _unified(ref_text: str, act_text: str, ref_no: Optional[int], act_no: Optional[int], context: int) -> str:
+    lines = difflib.unified_diff(
+        ref_text.splitlines(), act_text.splitlines(),
+        fromfile=f"reference page {ref_no}" if ref_no else "reference (none)",
+        tofile=f"actual page {act_no}" if act_no else "actual (none)",
+        n=context, lineterm="",
+    )
+    return "\n".join(lines)
+
+def _tokens(text: str) -> List[str]:
+    return text.split()
+
+def _similarity(ref_tokens: List[str], act_tokens: List[str], threshold: float) -> float:
+    """
+    difflib ratio of the pages' word sequences, or 0.0 when the cheap upper bounds already
+    rule out reaching threshold.
+    """
+    matcher = difflib.SequenceMatcher(None, ref_tokens, act_tokens)
+    if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+        return 0.0
+    ratio = matcher.ratio()
+    return ratio if ratio >= threshold else 0.0
+
+def _changed(ref_pages: List[str], act_pages: List[str], i: int, j: int, context: int) -> PageDiff:
+    return PageDiff(CHANGED, i + 1, j + 1, _unified(ref_pages[i], act_pages[j], i + 1, j + 1, context))
+
+def _removed(ref_pages: List[str], i: int, context: int) -> PageDiff:
+    return PageDiff(REMOVED, i + 1, None, _unified(ref_pages[i], "", i + 1, None, context))
+
+def _added(act_pages: List[str], j: int, context: int) -> PageDiff:
+    return PageDiff(ADDED, None, j + 1, _unified("", act_pages[j], None, j + 1, context))
+
+def _pair_positionally(ref_pages: List[str], act_pages: List[str], i1: int, i2: int, j1: int, j2: int,
+                       context: int) -> List[PageDiff]:
+    n, m = i2 - i1, j2 - j1
+    result = [_changed(ref_pages, act_pages, i1 + a, j1 + a, context) for a in range(min(n, m))]
+    result.extend(_removed(ref_pages, i, context) for i in range(i1 + min(n, m), i2))
+    result.extend(_added(act_pages, j, context) for j in range(j1 + min(n, m), j2))
+    return result
+
+def _pair_block(ref_pages: List[str], act_pages: List[str], i1: int, i2: int, j1: int, j2: int,
+                similarity_threshold: float, context: int, window: int, max_comparisons: int) -> List[PageDiff]:
+    """
+    Pair the pages of one replaced block. Equal-sized blocks whose pages all match their
+    counterpart at the same offset are paired positionally. Otherwise each reference page is
+    scored against the actual pages within window of its proportional position, and pages are
+    paired for maximal total similarity with page order kept; unpaired pages are reported as
+    removed/added. Blocks needing more than max_comparisons scores are paired positionally.
+    """
+    n, m = i2 - i1, j2 - j1
+    ref_tokens = [_tokens(ref_pages[i]) for i in range(i1, i2)]
+    act_tokens = [_tokens(act_pages[j]) for j in range(j1, j2)]
+    if n == m and all(_similarity(ref_tokens[a], act_tokens[a], similarity_threshold) for a in range(n)):
+        return _pair_positionally(ref_pages, act_pages, i1, i2, j1, j2, context)
+
+    candidates = []
+    for a in range(n):
+        centre = a * m // n
+        candidates.append(range(max(0, centre - window), min(m, centre + window + 1)))
+    if sum(len(c) for c in candidates) > max_comparisons:
+        return _pair_positionally(ref_pages, act_pages, i1, i2, j1, j2, context)
+
+    score: Dict[Tuple[int, int], float] = {}
+    for a, bs in enumerate(candidates):
+        for b in bs:
+            s = _similarity(ref_tokens[a], act_tokens[b], similarity_threshold)
+            if s > 0:
+                score[(a, b)] = s
+    #best[a][b]: best total similarity aligning ref pages a.. with act pages b..
+    best = [[0.0] * (m + 1) for _ in range(n + 1)]
+    for a in range(n - 1, -1, -1):
+        for b in range(m - 1, -1, -1):
+            s = score.get((a, b), 0.0)
+            paired = best[a + 1][b + 1] + s if s > 0 else 0.0
+            best[a][b] = max(paired, best[a + 1][b], best[a][b + 1])
+
+    result: List[PageDiff] = []
+    a = b = 0
+    while a < n or b < m:
+        s = score.get((a, b), 0.0)
+        if a < n and b < m and s > 0 and best[a][b] == best[a + 1][b + 1] + s:
+            result.append(_changed(ref_pages, act_pages, i1 + a, j1 + b, context))
+            a += 1
+            b += 1
+        elif a < n and (b == m or best[a][b] == best[a + 1][b]):
+            result.append(_removed(ref_pages, i1 + a, context))
+            a += 1
+        else:
+            result.append(_added(act_pages, j1 + b, context))
+            b += 1
+    return result
+
+def align_pages(ref_pages: List[str], act_pages: List[str],
+                similarity_threshold: float = 0.5, context: int = 2,
+                window: int = 3, max_comparisons: int = 2000) -> List[PageDiff]:
+    """
+    Align reference and actual pages. Identical pages are matched by hash of their
+    whitespace-normalized text; within each remaining block, pages are paired with their
+    best nearby match (word-level difflib ratio at least similarity_threshold, page order
+    kept, see _pair_block), the rest reported as removed/added. Changed pairs carry a
+    unified diff of only the differing lines. Page numbers are 1-based.
+    """
+    ref_hashes = [_page_hash(p) for p in ref_pages]
+    act_hashes = [_page_hash(p) for p in act_pages]
+    matcher = difflib.SequenceMatcher(a=ref_hashes, b=act_hashes, autojunk=False)
+
+    result: List[PageDiff] = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            result.extend(PageDiff(IDENTICAL, i + 1, j + 1) for i, j in zip(range(i1, i2), range(j1, j2)))
+        else:
+            result.extend(_pair_block(ref_pages, act_pages, i1, i2, j1, j2, similarity_threshold, context,
+                                      window, max_comparisons))
+    return result
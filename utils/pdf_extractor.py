@@ -0,0 +1,163 @@
+from __future__ import annotations
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+
+from utils.model_loader import MODEL_REGISTRY
+from utils.concurrency import lazy_singleton, process_map
+from utils.metrics import record_cache
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+def file_sha256(path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _extract_range(args: Tuple[str, int, int]) -> List[str]:
+    """Extract text of pages [start, stop); runs in a worker process."""
+    path, start, stop = args
+    with fitz.open(path) as doc:
+        return [doc.load_page(i).get_text() for i in range(start, stop)]
+
+class PDFTextExtractor:
+    """
+    Extracts per-page text from PDFs. Large PDFs are split into page ranges parsed in
+    worker processes, and results are cached on disk keyed by the file's sha256. Cached
+    entries unused for ttl_seconds are deleted, then the least recently used ones while the
+    cache exceeds max_cache_mb.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = "cache/pdf_text",
+                 parallel_min_pages: int = 64,
+                 max_workers: Optional[int] = None,
+                 ttl_seconds: Optional[float] = 604800,
+                 max_cache_mb: Optional[float] = 512):
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.parallel_min_pages = parallel_min_pages
+        self.max_workers = max_workers or (os.cpu_count() or 1)
+        self.ttl_seconds = ttl_seconds
+        self.max_cache_bytes = int(max_cache_mb * 1024 * 1024) if max_cache_mb is not None else None
+        self.evictions = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _cache_path(self, sha: str) -> Optional[Path]:
+        return self.cache_dir / f"{sha}.json" if self.cache_dir else None
+
+    def _cache_get(self, sha: str) -> Optional[List[str]]:
+        path = self._cache_path(sha)
+        if path is None or not path.exists():
+            return None
+        try:
+            pages = json.loads(path.read_text(encoding="utf-8"))
+            #The modification time doubles as last use for eviction
+            os.utime(path)
+            return pages
+        except Exception:
+            return None
+
+    def _cache_put(self, sha: str, pages: List[str]) -> None:
+        path = self._cache_path(sha)
+        if path is None:
+            return
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(pages, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        self._prune()
+
+    def _prune(self) -> None:
+        now = time.time()
+        entries = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        #Oldest first; the entry just written is the newest and is always kept
+        for mtime, size, path in entries[:-1]:
+            expired = self.ttl_seconds is not None and now - mtime > self.ttl_seconds
+            over = self.max_cache_bytes is not None and total > self.max_cache_bytes
+            if not expired and not over:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            evicted += 1
+        if evicted:
+            self.evictions += evicted
+            log.info("PDF text cache pruned", evicted=evicted, size_bytes=total)
+
+    def extract_pages(self, pdf_path) -> List[str]:
+        """
+        Return the text of every page of pdf_path (empty string for pages without text).
+        """
+        pdf_path = str(pdf_path)
+        sha = file_sha256(pdf_path)
+        pages = self._cache_get(sha)
+        if pages is not None:
+            self.hits += 1
+            record_cache("pdf_text", hits=1)
+            log.info("PDF text served from cache", pdf_path=pdf_path, sha256=sha, pages=len(pages))
+            return pages
+        self.misses += 1
+        record_cache("pdf_text", misses=1)
+
+        with fitz.open(pdf_path) as doc:
+            if doc.is_encrypted:
+                raise ValueError(f"PDF is encrypted: {Path(pdf_path).name}")
+            page_count = doc.page_count
+
+        #Give each worker at least half of parallel_min_pages pages so process start-up pays off
+        workers = 1
+        if page_count >= self.parallel_min_pages:
+            workers = min(self.max_workers, max(1, page_count // max(1, self.parallel_min_pages // 2)))
+        if workers == 1:
+            pages = _extract_range((pdf_path, 0, page_count))
+        else:
+            step = -(-page_count // workers)
+            ranges = [(pdf_path, s, min(s + step, page_count)) for s in range(0, page_count, step)]
+            pages = [text for part in process_map(_extract_range, ranges, max_parallel=len(ranges)) for text in part]
+
+        self._cache_put(sha, pages)
+        log.info("PDF text extracted", pdf_path=pdf_path, sha256=sha, pages=page_count, workers=workers)
+        return pages
+
+    def read_metadata(self, pdf_path) -> Dict[str, Any]:
+        """
+        Document-level metadata stored in the PDF itself (title, author, dates, page count).
+        """
+        with fitz.open(str(pdf_path)) as doc:
+            meta = dict(doc.metadata or {})
+            meta["page_count"] = doc.page_count
+        return meta
+
+@lazy_singleton
+def get_pdf_extractor() -> PDFTextExtractor:
+    """
+    Return the process-wide extractor configured under pdf_extraction in config.yaml.
+    """
+    cfg = MODEL_REGISTRY.get_config().get("pdf_extraction") or {}
+    ttl = cfg.get("ttl_seconds", 604800)
+    max_cache_mb = cfg.get("max_cache_mb", 512)
+    return PDFTextExtractor(
+        cache_dir = os.getenv("PDF_TEXT_CACHE_DIR", cfg.get("cache_dir", "cache/pdf_text")),
+        parallel_min_pages = int(cfg.get("parallel_min_pages", 64)),
+        max_workers = cfg.get("max_workers"),
+        ttl_seconds = float(ttl) if ttl is not None else None,
+        max_cache_mb = float(max_cache_mb) if max_cache_mb is not None else None,
+    )
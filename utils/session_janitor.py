@@ -0,0 +1,242 @@
+from __future__ import annotations
+import os
+import time
+import shutil
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from utils.model_loader import MODEL_REGISTRY
+from utils.vectorstore_cache import get_vectorstore_cache
+from utils.metrics import span, count_items
+from utils.concurrency import lazy_singleton
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+_TRASH_PREFIX = ".evicting-"
+
+@dataclass
+class _SessionUsage:
+    session_id: str
+    dirs: List[Path] = field(default_factory=list)
+    size_bytes: int = 0
+    last_used: float = 0.0
+
+class SessionJanitor:
+    """
+    Background garbage collector for per-session directories. A session is every child
+    directory with the same name across the store roots (uploads, analysis, comparison and
+    FAISS indexes). Sessions idle longer than ttl_seconds are deleted; while the stores exceed
+    max_total_mb, the least-recently-used sessions are deleted next. Sessions that are leased,
+    reported in use by a registered source, or touched within min_idle_seconds are never deleted.
+    """
+
+    def __init__(self, stores: Iterable[str], ttl_seconds: Optional[float] = 604800,
+                 max_total_mb: Optional[float] = None, min_idle_seconds: float = 900,
+                 interval_seconds: float = 600):
+        self.stores = [Path(s) for s in stores]
+        self.ttl_seconds = ttl_seconds
+        self.max_total_bytes = int(max_total_mb * 1024 * 1024) if max_total_mb else None
+        self.min_idle_seconds = min_idle_seconds
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._leases: Dict[str, int] = {}
+        self._touched: Dict[str, float] = {}
+        self._in_use_sources: List[Callable[[], Iterable[Optional[str]]]] = []
+        self._evict_listeners: List[Callable[[str], Any]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add_in_use_source(self, fn: Callable[[], Iterable[Optional[str]]]) -> None:
+        """Register a callable returning session ids that must not be deleted (e.g. running jobs)."""
+        self._in_use_sources.append(fn)
+
+    def add_evict_listener(self, fn: Callable[[str], Any]) -> None:
+        """Register a callable invoked with each deleted session id (e.g. to drop cached state)."""
+        self._evict_listeners.append(fn)
+
+    @contextmanager
+    def lease(self, session_id: Optional[str]) -> Iterator[None]:
+        """
+        Mark a session as in use for the duration of the block (and as used now).
+        """
+        if not session_id:
+            yield
+            return
+        with self._lock:
+            self._leases[session_id] = self._leases.get(session_id, 0) + 1
+            self._touched[session_id] = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._touched[session_id] = time.time()
+                if self._leases[session_id] <= 1:
+                    del self._leases[session_id]
+                else:
+                    self._leases[session_id] -= 1
+
+    def _in_use(self) -> Set[str]:
+        in_use: Set[str] = set()
+        for source in self._in_use_sources:
+            try:
+                in_use.update(s for s in source() if s)
+            except Exception as e:
+                log.warning("Session in-use source failed", error=str(e))
+        return in_use
+
+    def _scan(self) -> Dict[str, _SessionUsage]:
+        roots = {s.resolve() for s in self.stores}
+        sessions: Dict[str, _SessionUsage] = {}
+        for store in self.stores:
+            if not store.is_dir():
+                continue
+            for child in store.iterdir():
+                #Other store roots nested in this one (data/document_analysis) and reserved names are not sessions
+                if not child.is_dir() or child.name[0] in "._" or child.resolve() in roots:
+                    continue
+                try:
+                    mtime = child.stat().st_mtime
+                except OSError:
+                    continue
+                usage = sessions.setdefault(child.name, _SessionUsage(child.name))
+                usage.dirs.append(child)
+                usage.last_used = max(usage.last_used, mtime)
+                for dirpath, _, filenames in os.walk(child):
+                    for name in filenames:
+                        try:
+                            st = os.stat(os.path.join(dirpath, name))
+                        except OSError:
+                            continue
+                        usage.size_bytes += st.st_size
+                        usage.last_used = max(usage.last_used, st.st_mtime, st.st_atime)
+        return sessions
+
+    def _purge_trash(self) -> None:
+        #Leftovers of a sweep interrupted between rename and delete
+        for store in self.stores:
+            if store.is_dir():
+                for child in store.glob(f"{_TRASH_PREFIX}*"):
+                    shutil.rmtree(child, ignore_errors=True)
+
+    def _evict(self, usage: _SessionUsage, in_use: Set[str], now: float) -> bool:
+        with self._lock:
+            last_used = max(usage.last_used, self._touched.get(usage.session_id, 0.0))
+            if usage.session_id in self._leases or usage.session_id in in_use or now - last_used < self.min_idle_seconds:
+                return False
+            #Renaming under the lock is atomic, so a lease taken afterwards finds the session gone rather than half-deleted
+            trash = []
+            for d in usage.dirs:
+                target = d.with_name(f"{_TRASH_PREFIX}{d.name}-{int(now)}")
+                try:
+                    d.rename(target)
+                    trash.append(target)
+                except FileNotFoundError:
+                    continue
+            self._touched.pop(usage.session_id, None)
+        for d in trash:
+            get_vectorstore_cache().invalidate(d.with_name(usage.session_id))
+            shutil.rmtree(d, ignore_errors=True)
+        for listener in self._evict_listeners:
+            try:
+                listener(usage.session_id)
+            except Exception as e:
+                log.warning("Session evict listener failed", session_id=usage.session_id, error=str(e))
+        return True
+
+    def sweep(self) -> Dict[str, Any]:
+        """
+        Run one collection pass: TTL expiry first, then least-recently-used eviction down to the size quota.
+        """
+        with span("session_janitor_sweep"):
+            self._purge_trash()
+            now = time.time()
+            in_use = self._in_use()
+            sessions = list(self._scan().values())
+            with self._lock:
+                for usage in sessions:
+                    usage.last_used = max(usage.last_used, self._touched.get(usage.session_id, 0.0))
+                #Forget activity of sessions that no longer exist on disk
+                found = {u.session_id for u in sessions}
+                for session_id in [s for s in self._touched if s not in found and s not in self._leases]:
+                    del self._touched[session_id]
+            sessions.sort(key=lambda u: u.last_used)
+            total = sum(u.size_bytes for u in sessions)
+            expired: List[str] = []
+            evicted: List[str] = []
+            remaining: List[_SessionUsage] = []
+            for usage in sessions:
+                if self.ttl_seconds is not None and now - usage.last_used > self.ttl_seconds and self._evict(usage, in_use, now):
+                    expired.append(usage.session_id)
+                    total -= usage.size_bytes
+                else:
+                    remaining.append(usage)
+            if self.max_total_bytes is not None:
+                for usage in remaining:
+                    if total <= self.max_total_bytes:
+                        break
+                    if self._evict(usage, in_use, now):
+                        evicted.append(usage.session_id)
+                        total -= usage.size_bytes
+        count_items("session_janitor_deleted", len(expired) + len(evicted))
+        result = {"sessions": len(sessions), "expired": expired, "evicted": evicted, "total_bytes": total}
+        if expired or evicted:
+            log.info("Session janitor sweep", **result)
+        if self.max_total_bytes is not None and total > self.max_total_bytes:
+            log.warning("Session stores over quota; remaining sessions are in use", total_bytes=total,
+                        max_total_bytes=self.max_total_bytes)
+        return result
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                log.error("Session janitor sweep failed", error=str(e))
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="docportal-session-janitor", daemon=True)
+            self._thread.start()
+        log.info("Session janitor started", stores=[str(s) for s in self.stores], interval_seconds=self.interval_seconds)
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=5)
+
+def _default_stores() -> List[str]:
+    return [
+        os.getenv("UPLOAD_BASE", "data"),
+        os.getenv("DATA_STORAGE_PATH", os.path.join("data", "document_analysis")),
+        os.path.join("data", "document_comparison"),
+        os.getenv("FAISS_BASE", "faiss_index"),
+    ]
+
+@lazy_singleton
+def get_session_janitor() -> SessionJanitor:
+    """
+    Process-wide janitor configured under session_janitor in config.yaml
+    (SESSION_MAX_TOTAL_MB overrides max_total_mb).
+    """
+    cfg = MODEL_REGISTRY.get_config().get("session_janitor") or {}
+    max_total_mb = os.getenv("SESSION_MAX_TOTAL_MB", cfg.get("max_total_mb"))
+    ttl = cfg.get("ttl_seconds", 604800)
+    return SessionJanitor(
+        stores = cfg.get("stores") or _default_stores(),
+        ttl_seconds = float(ttl) if ttl is not None else None,
+        max_total_mb = float(max_total_mb) if max_total_mb is not None else None,
+        min_idle_seconds = float(cfg.get("min_idle_seconds", 900)),
+        interval_seconds = float(cfg.get("interval_seconds", 600)),
+    )
+
+def janitor_enabled() -> bool:
+    cfg = MODEL_REGISTRY.get_config().get("session_janitor") or {}
+    return bool(cfg.get("enabled", False))
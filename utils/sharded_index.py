@@ -0,0 +1,162 @@
+from __future__ import annotations
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from utils.model_loader import MODEL_REGISTRY
+from utils.faiss_store import store_exists
+from utils.lexical_index import LexicalIndex, hybrid_config, reciprocal_rank_fusion
+from utils.vectorstore_cache import get_vectorstore_cache
+from utils.metrics import count_items
+from utils.concurrency import lazy_singleton
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+SHARDS_DIR = "_shards"
+MANIFEST_FILE = "manifest.json"
+
+MetadataFilter = Union[Dict[str, Any], Callable[[Dict[str, Any]], bool]]
+Hit = Tuple[Document, float]
+
+def sharding_config(config: Optional[dict] = None) -> Dict[str, Any]:
+    config = config if config is not None else MODEL_REGISTRY.get_config()
+    return (config.get("faiss_db") or {}).get("sharding") or {}
+
+def shards_root(index_dir) -> Path:
+    return Path(index_dir) / SHARDS_DIR
+
+def is_sharded(index_dir) -> bool:
+    return (shards_root(index_dir) / MANIFEST_FILE).exists()
+
+def shard_dirs(index_dir) -> List[Path]:
+    """
+    Searchable shards of index_dir: an index saved in index_dir itself before sharding was
+    enabled, then every shard under _shards that has a saved store.
+    """
+    d = Path(index_dir)
+    dirs = [d] if store_exists(d) else []
+    root = shards_root(d)
+    if root.is_dir():
+        dirs.extend(sorted(p for p in root.iterdir() if p.is_dir() and store_exists(p)))
+    return dirs
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[MetadataFilter]) -> bool:
+    """
+    Same semantics as FAISS similarity_search filters: a callable, or a dict whose values must
+    equal the metadata value (or contain it, when the filter value is a list).
+    """
+    if filter is None:
+        return True
+    if callable(filter):
+        return bool(filter(metadata))
+    for key, value in filter.items():
+        actual = metadata.get(key)
+        if isinstance(value, list) and actual not in value:
+            return False
+        if not isinstance(value, list) and actual != value:
+            return False
+    return True
+
+@lazy_singleton
+def _search_executor() -> ThreadPoolExecutor:
+    workers = int(sharding_config().get("search_workers", 4))
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docportal-shard")
+
+class ShardedIndex:
+    """
+    Read side of a sharded index. The query is embedded once, every shard is searched on the
+    shard thread pool (dense, plus BM25 when hybrid retrieval is enabled) with the metadata
+    filter applied inside the shard, and the per-shard candidates are merged by score.
+    Shard stores come from the vector store cache, so only shards that changed are reloaded.
+    """
+
+    def __init__(self, index_dir, embeddings: Embeddings, config: Optional[dict] = None):
+        self.index_dir = Path(index_dir)
+        self.embeddings = embeddings
+        hybrid = hybrid_config(config)
+        self.hybrid = bool(hybrid.get("enabled", False))
+        self.bm25_k1 = float(hybrid.get("bm25_k1", 1.5))
+        self.bm25_b = float(hybrid.get("bm25_b", 0.75))
+        self._lexical: Dict[Path, LexicalIndex] = {}
+        self._lock = threading.Lock()
+
+    def _lexical_for(self, shard: Path) -> LexicalIndex:
+        with self._lock:
+            lexical = self._lexical.get(shard)
+            if lexical is None:
+                lexical = self._lexical[shard] = LexicalIndex(shard, k1=self.bm25_k1, b=self.bm25_b)
+            return lexical
+
+    def _search_shard(self, shard: Path, query: str, embedding: List[float], fetch_k: int,
+                      filter: Optional[MetadataFilter]) -> Tuple[List[Hit], List[Hit]]:
+        vs = get_vectorstore_cache().get(shard, self.embeddings)
+        #With a filter, over-fetch inside the shard so k matches survive filtering
+        over_fetch = fetch_k * 4 if filter is not None else fetch_k
+        dense = vs.similarity_search_with_score_by_vector(embedding, k=fetch_k, filter=filter, fetch_k=over_fetch)
+        sparse: List[Hit] = []
+        if self.hybrid:
+            lexical = self._lexical_for(shard)
+            if lexical.exists():
+                sparse = [(doc, score) for doc, score in lexical.search(query, k=over_fetch)
+                          if matches_filter(doc.metadata or {}, filter)][:fetch_k]
+        return dense, sparse
+
+    def search(self, query: str, fetch_k: int = 20,
+               filter: Optional[MetadataFilter] = None) -> Tuple[List[Document], List[Document]]:
+        """
+        Global top fetch_k dense (by distance) and lexical (by BM25 score) candidates across all shards.
+        """
+        shards = shard_dirs(self.index_dir)
+        if not shards:
+            return [], []
+        #Every shard is searched on each query; all of them must fit in the cache at once
+        get_vectorstore_cache().ensure_capacity(len(shards))
+        embedding = self.embeddings.embed_query(query)
+        if len(shards) == 1:
+            results = [self._search_shard(shards[0], query, embedding, fetch_k, filter)]
+        else:
+            futures = [_search_executor().submit(self._search_shard, s, query, embedding, fetch_k, filter) for s in shards]
+            results = [f.result() for f in futures]
+        count_items("shard_search", len(shards))
+        dense = sorted((hit for d, _ in results for hit in d), key=lambda hit: hit[1])[:fetch_k]
+        sparse = sorted((hit for _, s in results for hit in s), key=lambda hit: hit[1], reverse=True)[:fetch_k]
+        return [doc for doc, _ in dense], [doc for doc, _ in sparse]
+
+class ShardedRetriever(BaseRetriever):
+    """
+    Fans a query out to every shard and merges the results; dense and lexical candidates are
+    fused with reciprocal rank fusion when hybrid retrieval is enabled.
+    """
+
+    index: ShardedIndex
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+    filter: Optional[Any] = None
+
+    model_config = {"arbitrary_types_allowed": True}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        fetch_k = max(self.fetch_k, self.k) if self.index.hybrid else self.k
+        dense, sparse = self.index.search(query, fetch_k, self.filter)
+        if not self.index.hybrid:
+            return dense[:self.k]
+        return reciprocal_rank_fusion([dense, sparse], self.k, self.rrf_k)
+
+def make_sharded_retriever(index_dir, embeddings: Embeddings, k: int = 5, config: Optional[dict] = None,
+                           filter: Optional[MetadataFilter] = None) -> ShardedRetriever:
+    cfg = hybrid_config(config)
+    return ShardedRetriever(
+        index = ShardedIndex(index_dir, embeddings, config),
+        k = k,
+        fetch_k = int(cfg.get("fetch_k", 20)),
+        rrf_k = int(cfg.get("rrf_k", 60)),
+        filter = filter,
+    )
@@ -0,0 +1,150 @@
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.model_loader import MODEL_REGISTRY
+from utils.faiss_index import index_config, apply_search_params
+from utils.faiss_store import load_vectorstore, store_files, INDEX_FILE, DOCSTORE_FILE
+from utils.metrics import record_cache
+from utils.concurrency import lazy_singleton
+from logger.custom_logger import CustomLogger
+
+log = CustomLogger().get_logger(__name__)
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+@dataclass
+class _Entry:
+    store: Any
+    signature: Signature
+    size_bytes: int
+
+def _default_loader(index_dir: str, embeddings):
+    #Query path: memory-map the index when the store was saved in mmap mode
+    store = load_vectorstore(index_dir, embeddings, mmap = True)
+    apply_search_params(store.index, index_config())
+    return store
+
+class VectorStoreCache:
+    """
+    In-process LRU cache of loaded FAISS vector stores keyed by index directory.
+    Entries are invalidated when the store files change on disk and evicted by
+    entry count and an approximate memory budget (size of the files on disk).
+    """
+
+    def __init__(self, max_entries: int = 8, max_memory_mb: int = 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_memory_mb * 1024 * 1024
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(index_dir) -> str:
+        return str(Path(index_dir).resolve())
+
+    @staticmethod
+    def _signature(index_dir: str) -> Signature:
+        sig = []
+        for path in store_files(index_dir):
+            st = os.stat(path)
+            sig.append((path.name, st.st_mtime_ns, st.st_size))
+        if not sig or sig[0][0] != INDEX_FILE:
+            raise FileNotFoundError(f"No FAISS index found in {index_dir}")
+        return tuple(sig)
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, index_dir, embeddings, loader: Optional[Callable[[str, Any], Any]] = None):
+        """
+        Return the vector store for index_dir, loading it from disk only when it is
+        not cached or its files changed since it was loaded.
+        """
+        key = self._key(index_dir)
+        signature = self._signature(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                record_cache("vectorstore", hits=1)
+                return entry.store
+
+        with self._key_lock(key):
+            # Another thread may have loaded it while we waited
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry.signature == signature:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    record_cache("vectorstore", hits=1)
+                    return entry.store
+                self.misses += 1
+            record_cache("vectorstore", misses=1)
+
+            store = (loader or _default_loader)(key, embeddings)
+            #Memory-mapped stores only keep the index pages they touch resident; count the index file only
+            size = sum(s for name, _, s in signature if name != DOCSTORE_FILE)
+            with self._lock:
+                self._entries[key] = _Entry(store = store, signature = signature, size_bytes = size)
+                self._entries.move_to_end(key)
+                self._evict()
+            log.info("Vector store loaded into cache", index_dir = key, size_bytes = size,
+                     cached = len(self._entries))
+            return store
+
+    def invalidate(self, index_dir) -> None:
+        key = self._key(index_dir)
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                log.info("Vector store cache entry invalidated", index_dir = key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self) -> None:
+        total = sum(e.size_bytes for e in self._entries.values())
+        # Always keep the most recently used entry, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+            key, entry = self._entries.popitem(last = False)
+            total -= entry.size_bytes
+            log.info("Vector store evicted from cache", index_dir = key, size_bytes = entry.size_bytes)
+
+    def ensure_capacity(self, entries: int) -> None:
+        """
+        Raise max_entries to at least entries (e.g. the shard count of a sharded index) so
+        stores searched together do not evict each other; the memory budget still applies.
+        """
+        with self._lock:
+            if entries > self.max_entries:
+                log.warning("Vector store cache max_entries raised", previous = self.max_entries, max_entries = entries)
+                self.max_entries = entries
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size_bytes": sum(e.size_bytes for e in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+@lazy_singleton
+def get_vectorstore_cache() -> VectorStoreCache:
+    """
+    Return the process-wide cache configured from faiss_db.cache in config.yaml.
+    """
+    cfg = (MODEL_REGISTRY.get_config().get("faiss_db") or {}).get("cache") or {}
+    return VectorStoreCache(
+        max_entries = int(cfg.get("max_entries", 8)),
+        max_memory_mb = int(cfg.get("max_memory_mb", 1024)),
+    )